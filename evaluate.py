@@ -3,40 +3,101 @@
 
 import json
 import csv
+import os
 from datetime import datetime
 from typing import List, Dict, Tuple
 
+def numbers_to_mask(numbers: List[int]) -> int:
+    """
+    数字のリストをビットマスク（ビット位置 = 数字）に変換
+    """
+    mask = 0
+    for num in numbers:
+        mask |= 1 << int(num)
+    return mask
+
+def mask_to_numbers(mask: int) -> List[int]:
+    """
+    ビットマスクを昇順の数字リストに戻す
+    """
+    numbers = []
+    while mask:
+        lowest = mask & -mask
+        numbers.append(lowest.bit_length() - 1)
+        mask ^= lowest
+    return numbers
+
+def evaluation_log_path(evaluation_file: str) -> str:
+    """
+    評価結果ファイルに対応する追記ログ（1行1件）のパス
+    """
+    return os.path.splitext(evaluation_file)[0] + '.log'
+
+def read_evaluation_results(evaluation_file: str) -> Dict:
+    """
+    評価結果JSONを読み込み、保存前に中断した場合の追記ログを統合して返す
+    """
+    results = {}
+    try:
+        with open(evaluation_file, 'r', encoding='utf-8') as f:
+            results.update(json.loads(f.read()))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"評価結果読み込みエラー: {e}")
+    
+    # 保存前に中断した場合の追記分を統合
+    try:
+        with open(evaluation_log_path(evaluation_file), 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    evaluation = json.loads(line)
+                    results[evaluation['draw_date']] = evaluation
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"評価結果ログ読み込みエラー: {e}")
+    
+    return results
+
 class TotoEvaluator:
     def __init__(self, evaluation_file='evaluation_results.json'):
         """
         Toto予測評価クラスの初期化
         """
         self.evaluation_file = evaluation_file
+        # 前回の保存以降に追加した評価結果を1行1件で追記するログ
+        self.evaluation_log = evaluation_log_path(evaluation_file)
         self.results = self.load_evaluation_results()
         
     def load_evaluation_results(self) -> Dict:
         """
-        評価結果を読み込み
+        評価結果を読み込み（追記ログの分を含む）
         """
-        try:
-            with open(self.evaluation_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-        except Exception as e:
-            print(f"評価結果読み込みエラー: {e}")
-            return {}
+        return read_evaluation_results(self.evaluation_file)
     
     def save_evaluation_results(self):
         """
         評価結果を保存
         """
         try:
+            # 文字列化を先に一括で行い、書き込みは1回にまとめる
+            payload = json.dumps(self.results, ensure_ascii=False, indent=2)
             with open(self.evaluation_file, 'w', encoding='utf-8') as f:
-                json.dump(self.results, f, ensure_ascii=False, indent=2)
+                f.write(payload)
+            # JSONに反映済みのため追記ログは不要
+            if os.path.exists(self.evaluation_log):
+                os.remove(self.evaluation_log)
         except Exception as e:
             print(f"評価結果保存エラー: {e}")
     
+    def append_evaluation(self, evaluation: Dict):
+        """
+        評価結果1件を追記ログに記録（書き込みに失敗した場合は例外を送出）
+        """
+        with open(self.evaluation_log, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(evaluation, ensure_ascii=False) + '\n')
+    
     def evaluate_predictions(self, draw_date: str, predictions: List[Tuple[List[int], float]], 
                            actual_result: List[int]) -> Dict:
         """
@@ -68,18 +129,22 @@ class TotoEvaluator:
         best_hits = 0
         best_index = -1
         
+        actual_mask = numbers_to_mask(actual_sorted)
+        
         for i, (numbers, score) in enumerate(predictions):
             sorted_numbers = sorted(numbers)
-            hits = len(set(sorted_numbers) & set(actual_sorted))
+            pred_mask = numbers_to_mask(sorted_numbers)
+            hit_mask = pred_mask & actual_mask
+            hits = hit_mask.bit_count()
             
             prediction_eval = {
                 'index': i + 1,
                 'predicted_numbers': sorted_numbers,
                 'confidence_score': score,
                 'hit_count': hits,
-                'hit_numbers': list(set(sorted_numbers) & set(actual_sorted)),
-                'missed_numbers': list(set(actual_sorted) - set(sorted_numbers)),
-                'extra_numbers': list(set(sorted_numbers) - set(actual_sorted))
+                'hit_numbers': mask_to_numbers(hit_mask),
+                'missed_numbers': mask_to_numbers(actual_mask & ~pred_mask),
+                'extra_numbers': mask_to_numbers(pred_mask & ~actual_mask)
             }
             
             evaluation['predictions'].append(prediction_eval)
@@ -94,9 +159,10 @@ class TotoEvaluator:
         evaluation['summary']['best_prediction_index'] = best_index + 1
         evaluation['summary']['average_hit_count'] = total_hits / len(predictions)
         
-        # 結果を保存
+        # 結果を記録（ファイルには1件分だけ追記し、JSON全体の書き直しは
+        # save_evaluation_results でまとめて行う）
         self.results[draw_date] = evaluation
-        self.save_evaluation_results()
+        self.append_evaluation(evaluation)
         
         return evaluation
     
@@ -1,9 +1,60 @@
 import pandas as pd
 import numpy as np
-from collections import defaultdict, Counter
+from collections import Counter
 from scipy import stats
 from scipy.stats import chi2_contingency
-import math
+from functools import wraps
+import inspect
+import os
+from number_selection import PRIME_MASK
+
+NUMBER_COLUMNS = ['Number1', 'Number2', 'Number3', 'Number4', 'Number5', 'Number6']
+
+def _freeze_arrays(value):
+    """
+    キャッシュする配列（タプル内の配列を含む）を読み取り専用にする
+    """
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, tuple):
+        for item in value:
+            _freeze_arrays(item)
+    return value
+
+def _memoize(method):
+    """
+    特徴量メソッドの結果をインスタンス単位でキャッシュ（load_dataで破棄）
+    
+    結果は複製せずにキャッシュと共有する（配列は読み取り専用）。
+    dict/Counter/list の結果を変更する場合は、呼び出し側で複製してから変更すること
+    """
+    signature = inspect.signature(method)
+    # 引数なしの呼び出しは既定値で束縛したキーを使い回す
+    default_key = None
+    
+    def make_key(self, args, kwargs):
+        # f(10), f(recent_count=10), f() が同じキーになるよう既定値を補って束縛
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        return (method.__name__, tuple(bound.arguments.items())[1:])
+    
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        nonlocal default_key
+        if args or kwargs:
+            key = make_key(self, args, kwargs)
+        else:
+            if default_key is None:
+                default_key = make_key(self, args, kwargs)
+            key = default_key
+        if key not in self._feature_cache:
+            self._feature_cache[key] = _freeze_arrays(method(self, *args, **kwargs))
+        return self._feature_cache[key]
+    return wrapper
+
+# 数字 -> 平方数 の判定表（インデックス = 数字）
+SQUARE_MASK = np.zeros(50, dtype=bool)
+SQUARE_MASK[np.arange(8) ** 2] = True
 
 class TotoFeatures:
     def __init__(self, csv_file='T-maru.csv'):
@@ -12,18 +63,29 @@ class TotoFeatures:
         """
         self.csv_file = csv_file
         self.data = None
+        self.numbers_np = None
+        self.presence = None
         self.all_numbers = None
+        self.number_counts = None
+        self._feature_cache = {}
         self.load_data()
         
     def load_data(self):
         """
         CSVファイルからデータを読み込み
         """
+        self._feature_cache = {}
         try:
-            self.data = pd.read_csv(self.csv_file)
-            # 当選番号の列を抽出（ボーナス数字は除外）
-            number_columns = ['Number1', 'Number2', 'Number3', 'Number4', 'Number5', 'Number6']
-            self.all_numbers = self.data[number_columns].values.flatten()
+            # CSVの (更新時刻, サイズ) を読み込み前に取得し、キャッシュの照合に使う
+            stat = os.stat(self.csv_file)
+            csv_key = np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+            if not self._load_array_cache(csv_key):
+                # 当選番号は1-49なので int8 で読み込む
+                self.data = pd.read_csv(self.csv_file, dtype={col: np.int8 for col in NUMBER_COLUMNS})
+                # 当選番号の列を抽出（ボーナス数字は除外）
+                self.numbers_np = self.data[NUMBER_COLUMNS].to_numpy()
+                self._save_array_cache(csv_key)
+            self._build_number_arrays()
             print(f"データ読み込み完了: {len(self.data)}回分のデータ")
         except FileNotFoundError:
             print(f"エラー: {self.csv_file} が見つかりません")
@@ -32,90 +94,187 @@ class TotoFeatures:
             print(f"データ読み込みエラー: {e}")
             raise
     
+    def _build_number_arrays(self):
+        """
+        numbers_np から出現フラグ行列と出現回数を作成
+        """
+        # 出現フラグ行列 (抽選回数 x 50)、列インデックス = 数字
+        self.presence = np.zeros((len(self.numbers_np), 50), dtype=bool)
+        np.put_along_axis(self.presence, self.numbers_np.astype(np.intp), True, axis=1)
+        self.all_numbers = self.numbers_np.ravel()
+        # 数字ごとの総出現回数（インデックス = 数字）
+        self.number_counts = np.bincount(self.all_numbers, minlength=50)
+    
+    def update_with_draw(self, numbers, draw_date=None):
+        """
+        新しい抽選結果を1回分追加（CSVを再読み込みせずに配列を更新）
+        """
+        row = np.asarray(numbers, dtype=self.numbers_np.dtype).reshape(1, -1)
+        new_data = pd.DataFrame(row, columns=NUMBER_COLUMNS)
+        if 'DrawDate' in self.data:
+            new_data.insert(0, 'DrawDate', [draw_date])
+        self.data = pd.concat([self.data, new_data], ignore_index=True)
+        self.numbers_np = np.vstack([self.numbers_np, row])
+        
+        # 出現フラグ・出現回数は追加分だけ更新
+        presence_row = np.zeros((1, 50), dtype=bool)
+        presence_row[0, row[0].astype(np.intp)] = True
+        self.presence = np.vstack([self.presence, presence_row])
+        self.all_numbers = self.numbers_np.ravel()
+        self.number_counts += np.bincount(row[0], minlength=50)
+        
+        # 特徴量のキャッシュを破棄
+        self._feature_cache = {}
+    
+    def _load_array_cache(self, csv_key):
+        """
+        CSVの (更新時刻, サイズ) が一致する配列キャッシュ (<csv>.npz) があれば読み込む
+        """
+        cache_file = self.csv_file + '.npz'
+        if not os.path.exists(cache_file):
+            return False
+        
+        try:
+            with np.load(cache_file) as cache:
+                if 'columns' not in cache or 'csv_key' not in cache:
+                    # 列や照合キーを持たない旧形式のキャッシュは作り直す
+                    return False
+                if not np.array_equal(cache['csv_key'], csv_key):
+                    # 古い更新時刻のCSVに差し替えられた場合も含め、一致しなければ使わない
+                    return False
+                numbers = cache['numbers']
+                data = {}
+                for i, name in enumerate(cache['columns'].tolist()):
+                    values = cache[f'col_{i}']
+                    if f'null_{i}' in cache:
+                        # 文字列の列は object 型に戻し、欠損値を復元
+                        values = values.astype(object)
+                        values[cache[f'null_{i}']] = np.nan
+                    data[name] = values
+        except Exception as e:
+            print(f"キャッシュ読み込みエラー: {e}")
+            return False
+        
+        self.numbers_np = numbers
+        # CSVから読み込んだ場合と同じく全列を持つ
+        self.data = pd.DataFrame(data)
+        return True
+    
+    def _save_array_cache(self, csv_key):
+        """
+        解析済みのデータ（全列）と当選番号を配列キャッシュ (<csv>.npz) に保存
+        """
+        arrays = {}
+        for i, name in enumerate(self.data.columns):
+            column = self.data[name]
+            if column.dtype.kind in 'biuf':
+                arrays[f'col_{i}'] = column.to_numpy()
+            else:
+                # 文字列などの列は pickle を使わずに保存できるよう、欠損位置と文字列に分ける
+                arrays[f'null_{i}'] = column.isna().to_numpy()
+                arrays[f'col_{i}'] = column.fillna('').to_numpy(dtype=str)
+        
+        try:
+            np.savez(
+                self.csv_file + '.npz',
+                numbers=self.numbers_np,
+                csv_key=csv_key,
+                columns=np.array(self.data.columns, dtype=str),
+                **arrays
+            )
+        except OSError as e:
+            print(f"キャッシュ保存エラー: {e}")
+    
+    @_memoize
     def get_total_appearances(self):
         """
         各数字の総出現回数を計算
         """
-        return Counter(self.all_numbers)
+        return Counter({num: count for num, count in enumerate(self.number_counts.tolist()) if count})
     
+    @_memoize
     def get_recent_appearances(self, recent_count=10):
         """
         直近N回での出現回数を計算
         """
-        recent_numbers = self.all_numbers[-recent_count*6:]
-        return Counter(recent_numbers)
+        recent_counts = np.bincount(self.all_numbers[-recent_count*6:], minlength=50)
+        return Counter({num: count for num, count in enumerate(recent_counts.tolist()) if count})
     
+    @_memoize
     def get_missing_intervals(self):
         """
         各数字の未出間隔を計算
         """
-        missing_intervals = {}
-        number_columns = ['Number1', 'Number2', 'Number3', 'Number4', 'Number5', 'Number6']
+        # 最終出現位置から最新回までの回数 = 未出間隔
+        last_rows = self._get_last_rows()
+        missing = np.where(last_rows >= 0, len(self.presence) - 1 - last_rows, len(self.presence))
         
-        for num in range(1, 50):
-            last_appearance = -1
-            for i, row in self.data.iterrows():
-                if num in row[number_columns].values:
-                    last_appearance = i
-                    break
-            
-            if last_appearance == -1:
-                missing_intervals[num] = len(self.data)
-            else:
-                missing_intervals[num] = len(self.data) - 1 - last_appearance
-        
-        return missing_intervals
+        return dict(zip(range(1, 50), missing[1:50].tolist()))
+    
+    @_memoize
+    def _get_last_rows(self):
+        """
+        各数字の最終出現位置（未出現は -1、インデックス = 数字）
+        """
+        reversed_idx = np.argmax(self.presence[::-1], axis=0)
+        last_rows = len(self.presence) - 1 - reversed_idx
+        return np.where(self.presence.any(axis=0), last_rows, -1)
+    
+    @_memoize
+    def _get_sorted_numbers(self):
+        """
+        各回の当選番号を昇順に並べた配列
+        """
+        return np.sort(self.numbers_np, axis=1)
     
+    @_memoize
+    def _get_appearance_index(self):
+        """
+        各数字の出現位置を数字順・回順に並べた配列 (数字, 出現位置, 数字ごとの出現数)
+        """
+        nums, rows = np.nonzero(self.presence.T)
+        counts = np.bincount(nums, minlength=50)
+        return nums, rows, counts
+    
+    @_memoize
     def get_consecutive_pairs_frequency(self):
         """
         連番・ペアの出現頻度を計算
         """
-        consecutive_count = 0
-        pair_count = 0
         total_draws = len(self.data)
+        sorted_numbers = self._get_sorted_numbers()
         
-        for _, row in self.data.iterrows():
-            numbers = sorted([row['Number1'], row['Number2'], row['Number3'], 
-                            row['Number4'], row['Number5'], row['Number6']])
-            
-            # 連番チェック
-            for i in range(len(numbers)-1):
-                if numbers[i+1] - numbers[i] == 1:
-                    consecutive_count += 1
-            
-            # ペアチェック（差が2以内）
-            for i in range(len(numbers)-1):
-                for j in range(i+1, len(numbers)):
-                    if abs(numbers[j] - numbers[i]) <= 2:
-                        pair_count += 1
+        # 連番チェック
+        diffs = np.diff(sorted_numbers, axis=1)
+        consecutive_count = int((diffs == 1).sum())
+        
+        # ペアチェック（差が2以内）
+        upper_i, upper_j = np.triu_indices(6, 1)
+        pair_diffs = np.abs(sorted_numbers[:, upper_j] - sorted_numbers[:, upper_i])
+        pair_count = int((pair_diffs <= 2).sum())
         
         return {
             'consecutive_rate': consecutive_count / total_draws,
             'pair_rate': pair_count / (total_draws * 15)  # 6C2 = 15
         }
     
+    @_memoize
     def get_odd_even_ratio(self):
         """
         奇数・偶数の比率を計算
         """
-        odd_count = sum(1 for num in self.all_numbers if num % 2 == 1)
-        even_count = len(self.all_numbers) - odd_count
-        return odd_count / len(self.all_numbers)
+        odd_count = self.number_counts[1::2].sum()
+        return odd_count / self.all_numbers.size
     
+    @_memoize
     def get_number_statistics(self):
         """
         数字の合計、中央値、分散を計算
         """
-        number_columns = ['Number1', 'Number2', 'Number3', 'Number4', 'Number5', 'Number6']
-        sums = []
-        medians = []
-        variances = []
-        
-        for _, row in self.data.iterrows():
-            numbers = [row[col] for col in number_columns]
-            sums.append(sum(numbers))
-            medians.append(np.median(numbers))
-            variances.append(np.var(numbers))
+        draws = self.numbers_np.astype(np.float64)
+        sums = draws.sum(axis=1)
+        medians = np.median(draws, axis=1)
+        variances = draws.var(axis=1)
         
         return {
             'avg_sum': np.mean(sums),
@@ -126,30 +285,17 @@ class TotoFeatures:
             'variance_std': np.std(variances)
         }
     
+    @_memoize
     def get_prime_square_ratio(self):
         """
         素数、平方数の比率を計算
         """
-        def is_prime(n):
-            if n < 2:
-                return False
-            for i in range(2, int(math.sqrt(n)) + 1):
-                if n % i == 0:
-                    return False
-            return True
-        
-        def is_square(n):
-            root = int(math.sqrt(n))
-            return root * root == n
-        
-        prime_count = sum(1 for num in self.all_numbers if is_prime(num))
-        square_count = sum(1 for num in self.all_numbers if is_square(num))
-        
         return {
-            'prime_ratio': prime_count / len(self.all_numbers),
-            'square_ratio': square_count / len(self.all_numbers)
+            'prime_ratio': float(PRIME_MASK[self.all_numbers].mean()),
+            'square_ratio': float(SQUARE_MASK[self.all_numbers].mean())
         }
     
+    @_memoize
     def get_hot_cold_numbers(self, threshold=0.7):
         """
         ホット数字・コールド数字の判定
@@ -171,6 +317,7 @@ class TotoFeatures:
         
         return {'hot': hot_numbers, 'cold': cold_numbers}
     
+    @_memoize
     def get_distribution_patterns(self):
         """
         数字の分布パターン（区間別出現率）
@@ -185,102 +332,118 @@ class TotoFeatures:
         
         distribution = {}
         for name, (start, end) in intervals.items():
-            count = sum(1 for num in self.all_numbers if start <= num <= end)
-            distribution[name] = count / len(self.all_numbers)
+            count = self.number_counts[start:end + 1].sum()
+            distribution[name] = count / self.all_numbers.size
         
         return distribution
     
+    @_memoize
     def get_adjacent_correlation(self):
         """
         隣接数字の相関（前回出た数字の±1, ±2の出現傾向）
         """
-        adjacent_counts = defaultdict(int)
-        total_adjacent_opportunities = 0
+        prev_numbers = self.numbers_np[:-1, :, None].astype(np.int16)
+        curr_numbers = self.numbers_np[1:, None, :].astype(np.int16)
+        diffs = np.abs(curr_numbers - prev_numbers)
+        total_adjacent_opportunities = diffs.size
         
-        for i in range(1, len(self.data)):
-            prev_numbers = [self.data.iloc[i-1][f'Number{j}'] for j in range(1, 7)]
-            curr_numbers = [self.data.iloc[i][f'Number{j}'] for j in range(1, 7)]
-            
-            for prev_num in prev_numbers:
-                for curr_num in curr_numbers:
-                    diff = abs(curr_num - prev_num)
-                    if 1 <= diff <= 2:
-                        adjacent_counts[diff] += 1
-                    total_adjacent_opportunities += 1
+        adjacent_counts = {}
+        for diff in (1, 2):
+            count = int((diffs == diff).sum())
+            if count:
+                adjacent_counts[diff] = count
         
         return {k: v/total_adjacent_opportunities for k, v in adjacent_counts.items()}
     
+    @_memoize
     def get_periodicity_analysis(self):
         """
         周期性分析（特定の数字が何回おきに出現するか）
         """
-        periodicity = {}
+        nums, rows, counts = self._get_appearance_index()
         
+        # 同じ数字内で隣り合う出現位置の差 = 出現間隔
+        same_num = nums[1:] == nums[:-1]
+        gaps = np.diff(rows)[same_num]
+        gap_nums = nums[1:][same_num]
+        gap_counts = np.bincount(gap_nums, minlength=50)
+        avg_intervals = np.bincount(gap_nums, weights=gaps, minlength=50) / np.maximum(gap_counts, 1)
+        squared_dev = (gaps - avg_intervals[gap_nums]) ** 2
+        std_intervals = np.sqrt(np.bincount(gap_nums, weights=squared_dev, minlength=50) / np.maximum(gap_counts, 1))
+        last_rows = self._get_last_rows()
+        
+        periodicity = {}
         for num in range(1, 50):
-            appearances = []
-            for i, row in self.data.iterrows():
-                if num in [row['Number1'], row['Number2'], row['Number3'], 
-                          row['Number4'], row['Number5'], row['Number6']]:
-                    appearances.append(i)
-            
-            if len(appearances) > 1:
-                intervals = [appearances[i+1] - appearances[i] for i in range(len(appearances)-1)]
+            if counts[num] > 1:
                 periodicity[num] = {
-                    'avg_interval': np.mean(intervals),
-                    'std_interval': np.std(intervals),
-                    'last_appearance': appearances[-1] if appearances else -1
+                    'avg_interval': avg_intervals[num],
+                    'std_interval': std_intervals[num],
+                    'last_appearance': int(last_rows[num])
                 }
             else:
                 periodicity[num] = {
                     'avg_interval': float('inf'),
                     'std_interval': 0,
-                    'last_appearance': appearances[0] if appearances else -1
+                    'last_appearance': int(last_rows[num])
                 }
         
         return periodicity
     
+    @_memoize
     def get_combination_frequency(self):
         """
         数字間の同時出現頻度（組み合わせ分析）
         """
-        combinations = defaultdict(int)
         total_draws = len(self.data)
-        
-        for _, row in self.data.iterrows():
-            numbers = sorted([row['Number1'], row['Number2'], row['Number3'], 
-                            row['Number4'], row['Number5'], row['Number6']])
-            
-            for i in range(len(numbers)):
-                for j in range(i+1, len(numbers)):
-                    combinations[(numbers[i], numbers[j])] += 1
-        
-        # 上位10の組み合わせを返す
-        top_combinations = sorted(combinations.items(), key=lambda x: x[1], reverse=True)[:10]
-        return {combo: freq/total_draws for combo, freq in top_combinations}
+        sorted_numbers = self._get_sorted_numbers().astype(np.intp)
+        
+        # 同時出現行列 (50 x 50) に各回の15ペアを加算
+        upper_i, upper_j = np.triu_indices(6, 1)
+        co_occurrence = np.zeros((50, 50), dtype=np.int32)
+        np.add.at(co_occurrence, (sorted_numbers[:, upper_i].ravel(), sorted_numbers[:, upper_j].ravel()), 1)
+        
+        # 上位10の組み合わせを返す（同数の場合は数字の小さい組が先）
+        pair_i, pair_j = np.triu_indices(50, 1)
+        pair_counts = co_occurrence[pair_i, pair_j]
+        top = np.argsort(-pair_counts, kind='stable')[:10]
+        top = top[pair_counts[top] > 0]
+        return {(int(pair_i[k]), int(pair_j[k])): pair_counts[k] / total_draws for k in top}
     
+    @_memoize
     def get_regression_trend(self):
         """
         回帰分析による出現トレンド
         """
-        trends = {}
+        nums, rows, counts = self._get_appearance_index()
+        
+        # 数字ごとに x = 出現位置, y = 出現順 の単回帰を閉形式でまとめて計算
+        starts = np.cumsum(counts) - counts
+        order = np.arange(len(nums)) - starts[nums]
+        safe_counts = np.maximum(counts, 1)
+        x_dev = rows - (np.bincount(nums, weights=rows, minlength=50) / safe_counts)[nums]
+        y_dev = order - ((counts - 1) / 2)[nums]
+        ssx = np.bincount(nums, weights=x_dev * x_dev, minlength=50)
+        ssy = np.bincount(nums, weights=y_dev * y_dev, minlength=50)
+        ssxy = np.bincount(nums, weights=x_dev * y_dev, minlength=50)
+        
+        valid = counts > 5
+        slopes = np.zeros(50)
+        r_values = np.zeros(50)
+        p_values = np.ones(50)
+        slopes[valid] = ssxy[valid] / ssx[valid]
+        r_values[valid] = np.clip(ssxy[valid] / np.sqrt(ssx[valid] * ssy[valid]), -1.0, 1.0)
+        df = counts[valid] - 2
+        r = r_values[valid]
+        t = r * np.sqrt(df / ((1.0 - r + 1e-20) * (1.0 + r + 1e-20)))
+        p_values[valid] = 2 * stats.t.sf(np.abs(t), df)
         
+        trends = {}
         for num in range(1, 50):
-            appearances = []
-            for i, row in self.data.iterrows():
-                if num in [row['Number1'], row['Number2'], row['Number3'], 
-                          row['Number4'], row['Number5'], row['Number6']]:
-                    appearances.append(i)
-            
-            if len(appearances) > 5:
-                x = np.array(appearances)
-                y = np.arange(len(appearances))
-                
-                # 線形回帰
-                slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
+            if valid[num]:
                 trends[num] = {
-                    'slope': slope,
-                    'r_squared': r_value**2,
-                    'p_value': p_value
+                    'slope': slopes[num],
+                    'r_squared': r_values[num]**2,
+                    'p_value': p_values[num]
                 }
             else:
                 trends[num] = {
@@ -291,14 +454,15 @@ class TotoFeatures:
         
         return trends
     
+    @_memoize
     def get_chi_square_bias(self):
         """
         カイ二乗検定による偏りの検出
         """
-        observed = [self.all_numbers.count(i) for i in range(1, 50)]
-        expected = [len(self.all_numbers) / 49] * 49
+        observed = self.number_counts[1:50]
+        expected = np.full(49, self.all_numbers.size / 49)
         
-        chi2, p_value = stats.chisquare(observed, expected)
+        chi2, p_value = stats.chisquare(observed, f_exp=expected)
         
         return {
             'chi2_statistic': chi2,
@@ -306,75 +470,71 @@ class TotoFeatures:
             'is_biased': p_value < 0.05
         }
     
+    @_memoize
     def get_moving_average_trend(self, window=5):
         """
         移動平均による出現トレンド
         """
         trends = {}
+        n_draws = len(self.presence)
         
-        for num in range(1, 50):
-            appearances = []
-            for i, row in self.data.iterrows():
-                if num in [row['Number1'], row['Number2'], row['Number3'], 
-                          row['Number4'], row['Number5'], row['Number6']]:
-                    appearances.append(1)
-                else:
-                    appearances.append(0)
-            
-            if len(appearances) >= window:
-                moving_avg = pd.Series(appearances).rolling(window=window).mean()
-                trends[num] = {
-                    'current_trend': moving_avg.iloc[-1] if not pd.isna(moving_avg.iloc[-1]) else 0,
-                    'trend_direction': 'up' if moving_avg.iloc[-1] > moving_avg.iloc[-window] else 'down'
-                }
-            else:
+        if n_draws < window:
+            for num in range(1, 50):
                 trends[num] = {
                     'current_trend': 0,
                     'trend_direction': 'stable'
                 }
+            return trends
+        
+        # 最新回と window-1 回前を終端とする移動平均を全数字まとめて計算
+        current_avg = self.presence[-window:].mean(axis=0)
+        if n_draws >= 2 * window - 1:
+            previous_avg = self.presence[n_draws - 2*window + 1:n_draws - window + 1].mean(axis=0)
+            trend_up = current_avg > previous_avg
+        else:
+            # 比較対象の窓が揃わない場合は 'down' とする
+            trend_up = np.zeros(50, dtype=bool)
+        
+        for num in range(1, 50):
+            trends[num] = {
+                'current_trend': current_avg[num],
+                'trend_direction': 'up' if trend_up[num] else 'down'
+            }
         
         return trends
     
+    @_memoize
     def get_repeat_patterns(self):
         """
         前回との数字重複パターン
         """
-        repeat_counts = []
-        
-        for i in range(1, len(self.data)):
-            prev_numbers = set([self.data.iloc[i-1][f'Number{j}'] for j in range(1, 7)])
-            curr_numbers = set([self.data.iloc[i][f'Number{j}'] for j in range(1, 7)])
-            
-            repeat_count = len(prev_numbers.intersection(curr_numbers))
-            repeat_counts.append(repeat_count)
+        # 連続する2回の出現フラグの論理積 = 前回との重複数
+        repeat_counts = (self.presence[:-1] & self.presence[1:]).sum(axis=1)
         
         return {
             'avg_repeats': np.mean(repeat_counts),
-            'repeat_distribution': Counter(repeat_counts)
+            'repeat_distribution': Counter(repeat_counts.tolist())
         }
     
+    @_memoize
     def get_attraction_effect(self):
         """
         数字の「引き寄せ効果」（特定数字が出ると次に出やすい数字）
         """
-        attraction = defaultdict(lambda: defaultdict(int))
-        
-        for i in range(len(self.data) - 1):
-            prev_numbers = [self.data.iloc[i][f'Number{j}'] for j in range(1, 7)]
-            next_numbers = [self.data.iloc[i+1][f'Number{j}'] for j in range(1, 7)]
-            
-            for prev_num in prev_numbers:
-                for next_num in next_numbers:
-                    attraction[prev_num][next_num] += 1
+        # 遷移行列 M[a, b] = a が出た次の回に b が出た回数
+        prev_presence = self.presence[:-1].astype(np.int32)
+        next_presence = self.presence[1:].astype(np.int32)
+        attraction = prev_presence.T @ next_presence
+        most_attracted = attraction.argmax(axis=1)
+        strengths = attraction.max(axis=1)
         
         # 各数字について最も引き寄せ効果の強い数字を返す
         attraction_effects = {}
         for num in range(1, 50):
-            if num in attraction:
-                max_attracted = max(attraction[num].items(), key=lambda x: x[1])
+            if strengths[num] > 0:
                 attraction_effects[num] = {
-                    'most_attracted': max_attracted[0],
-                    'attraction_strength': max_attracted[1]
+                    'most_attracted': int(most_attracted[num]),
+                    'attraction_strength': int(strengths[num])
                 }
             else:
                 attraction_effects[num] = {
@@ -384,6 +544,7 @@ class TotoFeatures:
         
         return attraction_effects
     
+    @_memoize
     def calculate_all_features(self):
         """
         全ての特徴量を計算して辞書で返す
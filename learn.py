@@ -2,19 +2,91 @@
 # -*- coding: utf-8 -*-
 
 import json
-import statistics
-from typing import Dict, List, Tuple
+import os
+import numpy as np
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Tuple
 from evaluate import TotoEvaluator
 
+MAX_NUMBER = 49
+# 数字ごとの値を持ち、有効性分析に使う特徴量
+NUMBER_FEATURES = ('total_appearances', 'recent_appearances', 'missing_intervals')
+# 上記の特徴量は出現回数・未出回数（非負の整数）なので uint16 で保持
+FEATURE_DTYPE = np.uint16
+
+# 重み調整係数 (有効な特徴量 x 有効性, 無効な特徴量 x (1 - 有効性)) を予測結果の良し悪しで選択
+# 悪い結果: 有効な特徴量も半分の強さで抑制、無効な特徴量は強く抑制
+# 良い結果: 有効な特徴量を強化、無効な特徴量は弱く抑制（他の特徴量が効いている）
+ADJUSTMENT_COEFFICIENTS = {
+    False: (-0.5, -1.0),
+    True: (1.0, -0.3)
+}
+
+# 学習履歴（1行に1回分の {抽選日: 記録} を追記するJSON Lines形式）
+LEARNING_HISTORY_FILE = 'learning_history.ndjson'
+# 旧形式の学習履歴（{抽選日: 記録} 全体を1つのJSONに保存、他スクリプトも同名で別形式を使う）
+LEGACY_LEARNING_HISTORY_FILE = 'learning_history.json'
+
+def file_signature(stat: os.stat_result) -> Tuple[int, int, int, int]:
+    """
+    ファイルの変更判定用キー（inode・更新日時・状態変更日時・サイズ）
+    
+    置き換え（inode）や同じサイズでの書き直し（状態変更日時）も検出する
+    """
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_size)
+
+def copy_json(value):
+    """
+    JSON由来のデータ（dict/list/スカラー）を再帰的に複製
+    """
+    if isinstance(value, dict):
+        return {key: copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_json(item) for item in value]
+    return value
+
+@lru_cache(maxsize=64)
+def _read_json_cached(path: str, signature: Tuple[int, int, int, int]):
+    """
+    JSONファイルを読み込み（ファイルの変更判定用キーごとにキャッシュ）
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def read_json(path: str):
+    """
+    JSONファイルを読み込み（ファイルが変更されていなければキャッシュから複製して返す）
+    
+    返り値は呼び出しごとに別のオブジェクトなので、変更してもキャッシュには影響しない
+    """
+    return copy_json(_read_json_cached(path, file_signature(os.stat(path))))
+
+def write_json(path: str, data):
+    """
+    JSONファイルを書き込み（一時ファイルに書いてから置き換え）
+    """
+    payload = json.dumps(data, ensure_ascii=False, indent=2)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
 class TotoLearner:
-    def __init__(self, weights_file='weights.json', learning_rate=0.1):
+    def __init__(self, weights_file='weights.json', learning_rate=0.1, evaluator=None):
         """
         Toto学習クラスの初期化
+        
+        Args:
+            evaluator: 評価結果を共有する TotoEvaluator（省略時は新規作成）
         """
         self.weights_file = weights_file
         self.learning_rate = learning_rate
         self.weights = self.load_weights()
-        self.evaluator = TotoEvaluator()
+        # 特徴量名の並び（特徴量行列の行順）と 名前 -> 行 の対応
+        self._names = tuple(self.weights)
+        self._idx = {name: i for i, name in enumerate(self._names)}
+        self.evaluator = evaluator if evaluator is not None else TotoEvaluator()
         
     def load_weights(self) -> Dict:
         """
@@ -34,13 +106,12 @@ class TotoLearner:
         }
         
         try:
-            with open(self.weights_file, 'r', encoding='utf-8') as f:
-                loaded_weights = json.load(f)
-                # 新しい特徴量が追加された場合の対応
-                for key, value in default_weights.items():
-                    if key not in loaded_weights:
-                        loaded_weights[key] = value
-                return loaded_weights
+            loaded_weights = read_json(self.weights_file)
+            # 新しい特徴量が追加された場合の対応
+            for key, value in default_weights.items():
+                if key not in loaded_weights:
+                    loaded_weights[key] = value
+            return loaded_weights
         except FileNotFoundError:
             return default_weights
         except Exception as e:
@@ -52,113 +123,113 @@ class TotoLearner:
         重みを保存
         """
         try:
-            with open(self.weights_file, 'w', encoding='utf-8') as f:
-                json.dump(self.weights, f, ensure_ascii=False, indent=2)
+            write_json(self.weights_file, self.weights)
         except Exception as e:
             print(f"重み保存エラー: {e}")
     
-    def analyze_feature_performance(self, draw_date: str, features: Dict) -> Dict:
+    def analyze_feature_performance(self, evaluation: Dict, features: Dict) -> Dict:
         """
         各特徴量のパフォーマンスを分析
         
         Args:
-            draw_date: 抽選日
+            evaluation: 抽選日の評価結果
             features: 特徴量データ
             
         Returns:
             特徴量パフォーマンス分析結果
         """
-        evaluation = self.evaluator.results.get(draw_date)
-        if not evaluation:
-            return {}
-        
         actual_result = evaluation['actual_result']
         predictions = evaluation['predictions']
         
-        # 各特徴量の貢献度を分析
-        feature_performance = {}
+        feature_matrix = self.build_feature_matrix(features)
+        
+        # 実際に当選した数字と、2個以上当たった予測の数字（重複は除外）
+        actual_arr = np.unique(np.asarray(actual_result, dtype=np.int64))
+        hit_predictions = [pred['predicted_numbers'] for pred in predictions if pred['hit_count'] >= 2]
+        if hit_predictions:
+            predicted_arr = np.unique(np.concatenate(hit_predictions).astype(np.int64))
+        else:
+            predicted_arr = np.empty(0, dtype=np.int64)
         
-        for feature_name in self.weights.keys():
-            performance = self.analyze_single_feature(
-                feature_name, features, actual_result, predictions
-            )
-            feature_performance[feature_name] = performance
+        # 全特徴量の貢献度をまとめて分析
+        actual_avgs, predicted_avgs, effectiveness = self.compute_effectiveness(
+            feature_matrix, actual_arr, predicted_arr
+        )
+        
+        feature_performance = {}
+        for f_idx, feature_name in enumerate(self._names):
+            feature_performance[feature_name] = {
+                'actual_average': float(actual_avgs[f_idx]),
+                'predicted_average': float(predicted_avgs[f_idx]),
+                'effectiveness': float(effectiveness[f_idx]),
+                'contribution_score': 0.0  # 後で計算
+            }
         
         return feature_performance
     
-    def analyze_single_feature(self, feature_name: str, features: Dict, 
-                             actual_result: List[int], predictions: List[Dict]) -> Dict:
+    def build_feature_matrix(self, features: Dict) -> np.ndarray:
+        """
+        特徴量 x 数字 の値行列を作成（数字ごとの値を持たない特徴量の行は0）
+        """
+        feature_matrix = np.zeros((len(self._names), MAX_NUMBER + 1), dtype=FEATURE_DTYPE)
+        for feature_name in NUMBER_FEATURES:
+            f_idx = self._idx.get(feature_name)
+            if f_idx is None:
+                continue
+            feat_dict = features.get(feature_name) or {}
+            if feat_dict:
+                feature_matrix[f_idx, list(feat_dict.keys())] = list(feat_dict.values())
+        return feature_matrix
+    
+    def compute_effectiveness(self, feature_matrix: np.ndarray, 
+                              actual_arr: np.ndarray, predicted_arr: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        単一特徴量のパフォーマンスを分析
+        全特徴量の有効性をまとめて計算
+        
+        Args:
+            feature_matrix: 特徴量 x 数字 の値行列
+            actual_arr: 実際に当選した数字
+            predicted_arr: 予測で高スコアだった数字
+            
+        Returns:
+            (実際の数字の平均値, 予測数字の平均値, 有効性スコア) の特徴量ごとの配列
         """
-        # 実際に当選した数字の特徴量値を取得
-        actual_feature_values = {}
-        for num in actual_result:
-            if feature_name == 'total_appearances':
-                actual_feature_values[num] = features.get('total_appearances', {}).get(num, 0)
-            elif feature_name == 'recent_appearances':
-                actual_feature_values[num] = features.get('recent_appearances', {}).get(num, 0)
-            elif feature_name == 'missing_intervals':
-                actual_feature_values[num] = features.get('missing_intervals', {}).get(num, 0)
-            # 他の特徴量も同様に処理...
-        
-        # 予測で高スコアだった数字の特徴量値を取得
-        predicted_feature_values = {}
-        for pred in predictions:
-            if pred['hit_count'] >= 2:  # 2個以上当たった予測のみ考慮
-                for num in pred['predicted_numbers']:
-                    if feature_name == 'total_appearances':
-                        predicted_feature_values[num] = features.get('total_appearances', {}).get(num, 0)
-                    elif feature_name == 'recent_appearances':
-                        predicted_feature_values[num] = features.get('recent_appearances', {}).get(num, 0)
-                    elif feature_name == 'missing_intervals':
-                        predicted_feature_values[num] = features.get('missing_intervals', {}).get(num, 0)
-                    # 他の特徴量も同様に処理...
-        
-        # パフォーマンス指標を計算
-        actual_avg = statistics.mean(list(actual_feature_values.values())) if actual_feature_values else 0
-        predicted_avg = statistics.mean(list(predicted_feature_values.values())) if predicted_feature_values else 0
+        n_features = len(feature_matrix)
+        actual_avgs = feature_matrix[:, actual_arr].mean(axis=1) if actual_arr.size else np.zeros(n_features)
+        predicted_avgs = feature_matrix[:, predicted_arr].mean(axis=1) if predicted_arr.size else np.zeros(n_features)
         
         # 特徴量の有効性スコア（実際の値と予測値の相関）
-        effectiveness = 1.0 - abs(actual_avg - predicted_avg) / max(actual_avg, predicted_avg, 1)
+        scale = np.maximum(np.maximum(actual_avgs, predicted_avgs), 1)
+        effectiveness = np.maximum(0, 1.0 - np.abs(actual_avgs - predicted_avgs) / scale)
         
-        return {
-            'actual_average': actual_avg,
-            'predicted_average': predicted_avg,
-            'effectiveness': max(0, effectiveness),
-            'contribution_score': 0.0  # 後で計算
-        }
+        return actual_avgs, predicted_avgs, effectiveness
     
     def calculate_weight_adjustments(self, feature_performance: Dict, 
                                    evaluation: Dict) -> Dict:
         """
         重み調整量を計算
         """
-        adjustments = {}
         best_hit_count = evaluation['summary']['best_hit_count']
         avg_hit_count = evaluation['summary']['average_hit_count']
         
         # 全体的なパフォーマンススコア
         overall_performance = (best_hit_count / 6.0) * 0.7 + (avg_hit_count / 6.0) * 0.3
+        good_result = bool(overall_performance > 0.5)
         
-        for feature_name, performance in feature_performance.items():
-            effectiveness = performance['effectiveness']
-            
-            # 特徴量の貢献度を計算
-            if effectiveness > 0.6:  # 有効な特徴量
-                if overall_performance > 0.5:  # 良い予測結果
-                    adjustment = self.learning_rate * effectiveness
-                else:  # 悪い予測結果
-                    adjustment = -self.learning_rate * effectiveness * 0.5
-            else:  # 無効な特徴量
-                if overall_performance > 0.5:  # 良い予測結果（他の特徴量が効いている）
-                    adjustment = -self.learning_rate * (1 - effectiveness) * 0.3
-                else:  # 悪い予測結果
-                    adjustment = -self.learning_rate * (1 - effectiveness)
-            
-            adjustments[feature_name] = adjustment
+        names = list(feature_performance.keys())
+        eff = np.fromiter((feature_performance[name]['effectiveness'] for name in names),
+                          dtype=np.float64, count=len(names))
+        lr = self.learning_rate
+        
+        # 特徴量の貢献度を計算（予測結果の良し悪しで係数を選んでから一括計算）
+        effective_coef, ineffective_coef = ADJUSTMENT_COEFFICIENTS[good_result]
+        adjustments = np.where(
+            eff > 0.6,
+            effective_coef * lr * eff,
+            ineffective_coef * lr * (1 - eff)
+        )
         
-        return adjustments
+        return dict(zip(names, adjustments.tolist()))
     
     def apply_weight_adjustments(self, adjustments: Dict):
         """
@@ -167,19 +238,21 @@ class TotoLearner:
         print("\n🔧 重み調整:")
         print("-" * 40)
         
-        for feature_name, adjustment in adjustments.items():
-            old_weight = self.weights[feature_name]
-            new_weight = max(0.01, min(0.5, old_weight + adjustment))  # 0.01-0.5の範囲に制限
-            
-            self.weights[feature_name] = new_weight
-            
-            if abs(adjustment) > 0.001:  # 有意な変更のみ表示
-                print(f"{feature_name}: {old_weight:.3f} → {new_weight:.3f} ({adjustment:+.3f})")
+        names = tuple(self.weights)
+        old_weights = np.fromiter(self.weights.values(), dtype=np.float64, count=len(names))
+        adjusted = np.array([name in adjustments for name in names])
+        adjustment_arr = np.array([adjustments.get(name, 0.0) for name in names], dtype=np.float64)
+        
+        # 調整対象のみ 0.01-0.5 の範囲に制限して更新
+        new_weights = np.where(adjusted, np.clip(old_weights + adjustment_arr, 0.01, 0.5), old_weights)
+        
+        # 有意な変更のみ表示
+        for i in np.flatnonzero(adjusted & (np.abs(adjustment_arr) > 0.001)):
+            print(f"{names[i]}: {old_weights[i]:.3f} → {new_weights[i]:.3f} ({adjustment_arr[i]:+.3f})")
         
         # 重みの正規化（合計が1になるように）
-        total_weight = sum(self.weights.values())
-        for feature_name in self.weights:
-            self.weights[feature_name] /= total_weight
+        new_weights *= 1.0 / new_weights.sum()
+        self.weights = dict(zip(names, new_weights.tolist()))
         
         print("-" * 40)
         print("✅ 重み調整完了")
@@ -191,15 +264,15 @@ class TotoLearner:
         print(f"\n🧠 {draw_date} からの学習開始")
         print("=" * 50)
         
-        # 特徴量パフォーマンスを分析
-        feature_performance = self.analyze_feature_performance(draw_date, features)
-        
         # 評価結果を取得
         evaluation = self.evaluator.results.get(draw_date)
         if not evaluation:
             print("❌ 評価結果が見つかりません")
             return
         
+        # 特徴量パフォーマンスを分析
+        feature_performance = self.analyze_feature_performance(evaluation, features)
+        
         # 重み調整量を計算
         adjustments = self.calculate_weight_adjustments(feature_performance, evaluation)
         
@@ -235,15 +308,40 @@ class TotoLearner:
         
         print("-" * 40)
     
-    def get_learning_history(self) -> Dict:
+    def load_legacy_learning_history(self) -> Dict:
         """
-        学習履歴を取得
+        旧形式の学習履歴から、このクラスが保存した記録（weights_after を持つもの）のみを取得
         """
         try:
-            with open('learning_history.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(LEGACY_LEARNING_HISTORY_FILE, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
         except FileNotFoundError:
             return {}
+        except Exception as e:
+            print(f"旧学習履歴読み込みエラー: {e}")
+            return {}
+        
+        if not isinstance(legacy, dict):
+            return {}
+        return {
+            draw_date: record for draw_date, record in legacy.items()
+            if isinstance(record, dict) and 'weights_after' in record
+        }
+    
+    def get_learning_history(self) -> Dict:
+        """
+        学習履歴を取得（JSON Lines形式の履歴がまだない場合は旧形式から読み込み）
+        """
+        history = {}
+        try:
+            with open(LEARNING_HISTORY_FILE, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        # 同じ抽選日は後の記録で上書き
+                        history.update(json.loads(line))
+            return history
+        except FileNotFoundError:
+            return self.load_legacy_learning_history()
         except Exception as e:
             print(f"学習履歴読み込みエラー: {e}")
             return {}
@@ -251,20 +349,25 @@ class TotoLearner:
     def save_learning_history(self, draw_date: str, adjustments: Dict, 
                             feature_performance: Dict):
         """
-        学習履歴を保存
+        学習履歴を保存（履歴ファイルに1行追記）
         """
-        history = self.get_learning_history()
-        
-        history[draw_date] = {
-            'timestamp': str(np.datetime64('now')),
-            'adjustments': adjustments,
-            'feature_performance': feature_performance,
-            'weights_after': self.weights.copy()
+        record = {
+            draw_date: {
+                'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'adjustments': adjustments,
+                'feature_performance': feature_performance,
+                'weights_after': self.weights.copy()
+            }
         }
         
         try:
-            with open('learning_history.json', 'w', encoding='utf-8') as f:
-                json.dump(history, f, ensure_ascii=False, indent=2)
+            # 初回の追記時は旧形式の履歴を先頭に書き写して引き継ぐ
+            # （旧ファイルは他スクリプトも使うため残す）
+            legacy = {} if os.path.exists(LEARNING_HISTORY_FILE) else self.load_legacy_learning_history()
+            with open(LEARNING_HISTORY_FILE, 'a', encoding='utf-8') as f:
+                for old_date, old_record in legacy.items():
+                    f.write(json.dumps({old_date: old_record}, ensure_ascii=False) + '\n')
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
         except Exception as e:
             print(f"学習履歴保存エラー: {e}")
     
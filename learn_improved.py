@@ -5,9 +5,64 @@
 より詳細な分析と重み調整
 """
 
-import json
-import statistics
+import os
+import numpy as np
 from collections import defaultdict
+from functools import lru_cache
+from evaluate import evaluation_log_path, read_evaluation_results
+from learn import copy_json, file_signature, read_json, write_json
+
+EVALUATION_RESULTS_FILE = 'evaluation_results.json'
+
+# 重み調整テーブル（行: 的中率 15%未満 / 15-25% / 25%以上、列: ADJUSTMENT_FEATURES）
+ADJUSTMENT_FEATURES = (
+    "total_appearances", "recent_appearances", "missing_intervals", "hot_cold", "periodicity",
+    "regression_trend", "moving_average", "attraction_effect", "distribution", "adjacent_correlation"
+)
+ADJUSTMENT_INDEX = {name: i for i, name in enumerate(ADJUSTMENT_FEATURES)}
+HIT_RATE_THRESHOLDS = (0.15, 0.25)
+ADJUSTMENT_TABLE = np.array([
+    # 大幅な調整
+    [-0.010, -0.010, +0.020, +0.010, +0.010, +0.010, +0.010, +0.010, +0.010, +0.010],
+    # 中程度の調整
+    [-0.005, -0.005, +0.010, +0.005, +0.005, +0.005, +0.005, +0.005, +0.005, +0.005],
+    # 現在の重みを維持
+    [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+])
+
+def _scan_evaluation_files(directory):
+    """評価ファイル (evaluation_*.json) の (ファイル名, 変更判定用キー) 一覧を取得"""
+    files = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith('evaluation_') and entry.name.endswith('.json') and entry.is_file():
+                # scandir の stat は Windows で inode を含まないため os.stat を使う
+                files.append((entry.name, file_signature(os.stat(entry.path))))
+    return tuple(sorted(files))
+
+def _evaluation_log_signature(directory):
+    """評価結果の追記ログの変更判定用キー（ログがなければ None）"""
+    try:
+        return file_signature(os.stat(evaluation_log_path(os.path.join(directory, EVALUATION_RESULTS_FILE))))
+    except FileNotFoundError:
+        return None
+
+@lru_cache(maxsize=8)
+def _load_evaluation_files(directory, file_stats, log_signature):
+    """評価ファイルを読み込んで統合（ファイル一覧・追記ログの変更判定用キーが同じ間はキャッシュを返す）"""
+    # evaluation_results.json と、保存前に中断した場合の追記ログから読み込み
+    data = read_evaluation_results(os.path.join(directory, EVALUATION_RESULTS_FILE))
+    
+    # 個別の評価ファイルから読み込み
+    for filename, _ in file_stats:
+        try:
+            eval_data = read_json(os.path.join(directory, filename))
+            if 'date' in eval_data:
+                data[eval_data['date']] = eval_data
+        except:
+            continue
+    
+    return data
 
 class ImprovedLearningSystem:
     def __init__(self):
@@ -17,8 +72,7 @@ class ImprovedLearningSystem:
     def load_weights(self):
         """重み設定を読み込み"""
         try:
-            with open('weights.json', 'r', encoding='utf-8') as file:
-                return json.load(file)
+            return read_json('weights.json')
         except FileNotFoundError:
             return {
                 "total_appearances": 0.15,
@@ -35,59 +89,72 @@ class ImprovedLearningSystem:
     
     def load_evaluation_data(self):
         """評価データを読み込み"""
-        data = {}
-        
-        # evaluation_results.jsonから読み込み
-        try:
-            with open('evaluation_results.json', 'r', encoding='utf-8') as file:
-                data.update(json.load(file))
-        except FileNotFoundError:
-            pass
-        
-        # 個別の評価ファイルから読み込み
-        import glob
-        for filename in glob.glob('evaluation_*.json'):
-            try:
-                with open(filename, 'r', encoding='utf-8') as file:
-                    eval_data = json.load(file)
-                    if 'date' in eval_data:
-                        data[eval_data['date']] = eval_data
-            except:
-                continue
-        
-        return data
+        directory = os.getcwd()
+        # キャッシュと共有しないよう、入れ子のリストまで複製して返す
+        return copy_json(_load_evaluation_files(
+            directory, _scan_evaluation_files(directory), _evaluation_log_signature(directory)
+        ))
     
-    def analyze_pattern_performance(self):
-        """パターン別性能分析"""
-        pattern_stats = defaultdict(lambda: {
-            'total_predictions': 0,
-            'total_hits': 0,
-            'hit_rates': [],
-            'confidence_scores': []
-        })
+    def extract_prediction_arrays(self):
+        """評価データの全予測をパターンごとに連続した的中数・信頼度の配列に展開"""
+        # 1パス目: パターンごとの予測数を数える
+        pattern_counts = {}
+        for date, result in self.evaluation_data.items():
+            if 'predictions' in result:
+                for pred in result['predictions']:
+                    pattern_num = pred.get('pattern', 1)
+                    pattern_counts[pattern_num] = pattern_counts.get(pattern_num, 0) + 1
         
+        patterns = list(pattern_counts)
+        totals = np.fromiter(pattern_counts.values(), dtype=np.int64, count=len(patterns))
+        offsets = np.cumsum(totals) - totals
+        
+        # 2パス目: 各パターンの区間に値を書き込む
+        hits = np.empty(int(totals.sum()), dtype=np.int64)
+        confidences = np.empty(len(hits), dtype=np.float64)
+        cursors = dict(zip(patterns, offsets.tolist()))
         for date, result in self.evaluation_data.items():
             if 'predictions' in result:
                 for pred in result['predictions']:
                     pattern_num = pred.get('pattern', 1)
-                    hits = pred.get('hits', pred.get('hit_count', 0))
-                    confidence = pred.get('confidence', 50)
-                    
-                    stats = pattern_stats[pattern_num]
-                    stats['total_predictions'] += 1
-                    stats['total_hits'] += hits
-                    stats['hit_rates'].append(hits / 6.0)  # 6個中何個当たったか
-                    stats['confidence_scores'].append(confidence)
+                    pos = cursors[pattern_num]
+                    cursors[pattern_num] = pos + 1
+                    hits[pos] = pred.get('hits', pred.get('hit_count', 0))
+                    confidences[pos] = pred.get('confidence', 50)
+        
+        return patterns, offsets, totals, hits, confidences
+    
+    def analyze_pattern_performance(self):
+        """パターン別性能分析"""
+        patterns, offsets, totals, hits, confidences = self.extract_prediction_arrays()
+        pattern_stats = {}
+        if not patterns:
+            return pattern_stats
+        
+        hit_rates = hits / 6.0  # 6個中何個当たったか
+        
+        # パターンごとの合計を区間ごとにまとめて集計
+        hit_totals = np.add.reduceat(hits, offsets)
+        hit_rate_sums = np.add.reduceat(hit_rates, offsets)
+        confidence_sums = np.add.reduceat(confidences, offsets)
         
         # 統計計算
-        for pattern_num, stats in pattern_stats.items():
-            if stats['total_predictions'] > 0:
-                stats['average_hit_rate'] = statistics.mean(stats['hit_rates'])
-                stats['average_confidence'] = statistics.mean(stats['confidence_scores'])
-                stats['overall_hit_rate'] = stats['total_hits'] / (stats['total_predictions'] * 6)
-                stats['confidence_accuracy'] = self.calculate_confidence_accuracy(
-                    stats['confidence_scores'], stats['hit_rates']
-                )
+        for i, pattern_num in enumerate(patterns):
+            start = offsets[i]
+            total_predictions = int(totals[i])
+            stats = {
+                'total_predictions': total_predictions,
+                'total_hits': int(hit_totals[i]),
+                'hit_rates': hit_rates[start:start + total_predictions],
+                'confidence_scores': confidences[start:start + total_predictions],
+                'average_hit_rate': hit_rate_sums[i] / total_predictions,
+                'average_confidence': confidence_sums[i] / total_predictions,
+                'overall_hit_rate': hit_totals[i] / (total_predictions * 6)
+            }
+            stats['confidence_accuracy'] = self.calculate_confidence_accuracy(
+                stats['confidence_scores'], stats['hit_rates']
+            )
+            pattern_stats[pattern_num] = stats
         
         return pattern_stats
     
@@ -96,12 +163,17 @@ class ImprovedLearningSystem:
         if len(confidences) < 2:
             return 0.0
         
-        # 信頼度と的中率の相関係数
-        try:
-            correlation = statistics.correlation(confidences, hit_rates)
-            return max(0, correlation)  # 負の相関は0として扱う
-        except:
+        # 信頼度と的中率の相関係数（どちらかが一定なら相関なし）
+        conf_dev = np.asarray(confidences, dtype=np.float64)
+        conf_dev = conf_dev - conf_dev.mean()
+        hit_dev = np.asarray(hit_rates, dtype=np.float64)
+        hit_dev = hit_dev - hit_dev.mean()
+        denominator = np.sqrt(np.dot(conf_dev, conf_dev) * np.dot(hit_dev, hit_dev))
+        if denominator == 0:
             return 0.0
+        
+        correlation = float(np.dot(conf_dev, hit_dev) / denominator)
+        return max(0, correlation)  # 負の相関は0として扱う
     
     def analyze_feature_effectiveness(self):
         """特徴量の有効性分析"""
@@ -144,62 +216,21 @@ class ImprovedLearningSystem:
                     top_pattern_performance.append(stats['average_hit_rate'])
         
         # 全体の平均的中率
-        overall_hit_rate = statistics.mean(top_pattern_performance) if top_pattern_performance else 0.5
-        
-        # 重み調整の方向性を決定
-        adjustments = {}
-        
-        if overall_hit_rate >= 0.25:  # 25%以上の的中率
-            # 現在の重みを維持または微調整
-            adjustments = {
-                "total_appearances": 0.0,
-                "recent_appearances": 0.0,
-                "missing_intervals": 0.0,
-                "hot_cold": 0.0,
-                "periodicity": 0.0,
-                "regression_trend": 0.0,
-                "moving_average": 0.0,
-                "attraction_effect": 0.0,
-                "distribution": 0.0,
-                "adjacent_correlation": 0.0
-            }
-        elif overall_hit_rate >= 0.15:  # 15-25%の的中率
-            # 中程度の調整
-            adjustments = {
-                "total_appearances": -0.005,
-                "recent_appearances": -0.005,
-                "missing_intervals": +0.010,
-                "hot_cold": +0.005,
-                "periodicity": +0.005,
-                "regression_trend": +0.005,
-                "moving_average": +0.005,
-                "attraction_effect": +0.005,
-                "distribution": +0.005,
-                "adjacent_correlation": +0.005
-            }
-        else:  # 15%未満の的中率
-            # 大幅な調整
-            adjustments = {
-                "total_appearances": -0.010,
-                "recent_appearances": -0.010,
-                "missing_intervals": +0.020,
-                "hot_cold": +0.010,
-                "periodicity": +0.010,
-                "regression_trend": +0.010,
-                "moving_average": +0.010,
-                "attraction_effect": +0.010,
-                "distribution": +0.010,
-                "adjacent_correlation": +0.010
-            }
+        overall_hit_rate = float(np.mean(top_pattern_performance)) if top_pattern_performance else 0.5
+        
+        # 重み調整の方向性を決定（的中率 15%未満 / 15-25% / 25%以上）
+        regime = int(np.searchsorted(HIT_RATE_THRESHOLDS, overall_hit_rate, side='right'))
+        adjustment_values = ADJUSTMENT_TABLE[regime].copy()
         
         # パターン別性能に基づく微調整
         if 1 in pattern_stats and pattern_stats[1]['total_predictions'] > 0:
             pattern1_performance = pattern_stats[1]['average_hit_rate']
             if pattern1_performance < 0.15:
                 # パターン1の性能が悪い場合、基本特徴量を強化
-                adjustments["total_appearances"] += 0.005
-                adjustments["recent_appearances"] += 0.005
+                adjustment_values[ADJUSTMENT_INDEX["total_appearances"]] += 0.005
+                adjustment_values[ADJUSTMENT_INDEX["recent_appearances"]] += 0.005
         
+        adjustments = dict(zip(ADJUSTMENT_FEATURES, adjustment_values.tolist()))
         return adjustments, overall_hit_rate
     
     def apply_weight_adjustments(self, adjustments):
@@ -210,24 +241,27 @@ class ImprovedLearningSystem:
         # 現在の重みを表示
         print("📊 調整前の重み設定:")
         print("-" * 40)
+        total_weight = 0.0
         for feature, weight in self.weights.items():
             print(f"  {feature}: {weight:.3f}")
+            total_weight += weight
         
-        # 調整を適用
+        # 調整を適用（合計も差分で更新）
         print(f"\n📈 重み調整:")
         print("-" * 40)
         for feature, adjustment in adjustments.items():
             old_weight = self.weights[feature]
             new_weight = max(0.01, old_weight + adjustment)  # 最小0.01を保証
             self.weights[feature] = new_weight
+            total_weight += new_weight - old_weight
             
             change = "+" if adjustment >= 0 else ""
             print(f"  {feature}: {old_weight:.3f} → {new_weight:.3f} ({change}{adjustment:.3f})")
         
         # 重みの正規化
-        total_weight = sum(self.weights.values())
+        inv_total = 1.0 / total_weight
         for feature in self.weights:
-            self.weights[feature] /= total_weight
+            self.weights[feature] *= inv_total
         
         print(f"\n⚖️ 調整後の重み設定:")
         print("-" * 40)
@@ -235,8 +269,7 @@ class ImprovedLearningSystem:
             print(f"  {feature}: {weight:.3f}")
         
         # 重みを保存
-        with open('weights.json', 'w', encoding='utf-8') as file:
-            json.dump(self.weights, file, indent=2, ensure_ascii=False)
+        write_json('weights.json', self.weights)
         
         print(f"\n✅ 重み調整完了")
         print("=" * 40)
@@ -2,79 +2,214 @@
 # -*- coding: utf-8 -*-
 
 import pandas as pd
+import numpy as np
 import json
 import csv
+import io
+import os
+import sys
 from datetime import datetime
-from typing import List, Dict, Tuple
-from features import TotoFeatures
+from itertools import islice
+from typing import List, Dict, Tuple, Iterator
+from features import TotoFeatures, NUMBER_COLUMNS
 from predict_adaptive import TotoPredictorAdaptive
 from evaluate import TotoEvaluator
 from learn import TotoLearner
 
+PROCESSED_DATES_FILE = 'processed_dates.json'
+# 前回の保存以降に処理した日付を1行ずつ追記するログ
+PROCESSED_DATES_LOG = 'processed_dates.log'
+
 class TotoLearningSystem:
-    def __init__(self, csv_file='totomaru.csv'):
+    def __init__(self, csv_file='totomaru.csv', verbose=True):
         """
         自己学習型Totoシステムの初期化
+        
+        Args:
+            csv_file: 抽選データのCSVファイル
+            verbose: Falseの場合、抽選ごとの処理ログを表示しない
         """
         self.csv_file = csv_file
+        self.verbose = verbose
         self.predictor = TotoPredictorAdaptive(csv_file)
         self.evaluator = TotoEvaluator()
-        self.learner = TotoLearner()
+        self.learner = TotoLearner(evaluator=self.evaluator)
         self.processed_dates = self.load_processed_dates()
+        # 読み込み済みCSVのキャッシュ（DataFrame, 更新時刻）
+        self._csv_cache = (None, None)
+        # 抽選ごとの処理ログのバッファ
+        self._log_buffer = io.StringIO()
         
     def load_processed_dates(self) -> set:
         """
         既に処理済みの日付を読み込み
         """
+        processed_dates = set()
         try:
-            with open('processed_dates.json', 'r', encoding='utf-8') as f:
-                return set(json.load(f))
+            with open(PROCESSED_DATES_FILE, 'r', encoding='utf-8') as f:
+                processed_dates.update(json.load(f))
         except FileNotFoundError:
-            return set()
+            pass
         except Exception as e:
             print(f"処理済み日付読み込みエラー: {e}")
-            return set()
+        
+        # 保存前に中断した場合の追記分を統合
+        try:
+            with open(PROCESSED_DATES_LOG, 'r', encoding='utf-8') as f:
+                processed_dates.update(line.strip() for line in f if line.strip())
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"処理済み日付ログ読み込みエラー: {e}")
+        
+        return processed_dates
     
     def save_processed_dates(self):
         """
         処理済み日付を保存
         """
         try:
-            with open('processed_dates.json', 'w', encoding='utf-8') as f:
-                json.dump(list(self.processed_dates), f, ensure_ascii=False, indent=2)
+            with open(PROCESSED_DATES_FILE, 'w', encoding='utf-8') as f:
+                # 整形なしで出力（日付順に並べて差分を安定させる）
+                json.dump(sorted(self.processed_dates), f, ensure_ascii=False, separators=(',', ':'))
+            # JSONに反映済みのため追記ログは不要
+            if os.path.exists(PROCESSED_DATES_LOG):
+                os.remove(PROCESSED_DATES_LOG)
         except Exception as e:
             print(f"処理済み日付保存エラー: {e}")
     
-    def get_unprocessed_draws(self) -> List[Dict]:
+    def append_processed_date(self, draw_date: str):
         """
-        未処理の抽選データを取得
+        処理済み日付を追記ログに記録
         """
+        self.processed_dates.add(draw_date)
         try:
-            df = pd.read_csv(self.csv_file)
-            unprocessed = []
-            
-            for _, row in df.iterrows():
-                draw_date = row['DrawDate']
-                if draw_date not in self.processed_dates:
-                    # 実際の結果を取得
-                    actual_result = [
-                        row['Number1'], row['Number2'], row['Number3'],
-                        row['Number4'], row['Number5'], row['Number6']
-                    ]
-                    unprocessed.append({
-                        'date': draw_date,
-                        'actual_result': actual_result
-                    })
+            with open(PROCESSED_DATES_LOG, 'a', encoding='utf-8') as f:
+                f.write(draw_date + '\n')
+        except Exception as e:
+            print(f"処理済み日付追記エラー: {e}")
+    
+    def load_draws(self) -> pd.DataFrame:
+        """
+        抽選データを読み込み（CSVが更新されていなければキャッシュを返す）
+        """
+        mtime = os.stat(self.csv_file).st_mtime_ns
+        df, cached_mtime = self._csv_cache
+        if cached_mtime == mtime:
+            return df
+        
+        # 使用する列のみを型指定して読み込み
+        dtypes = {col: np.int8 for col in NUMBER_COLUMNS}
+        dtypes['DrawDate'] = 'string'
+        df = pd.read_csv(
+            self.csv_file,
+            usecols=['DrawDate'] + NUMBER_COLUMNS,
+            dtype=dtypes
+        )
+        self._csv_cache = (df, mtime)
+        return df
+    
+    def count_unprocessed_draws(self) -> int:
+        """
+        未処理の抽選数を取得
+        """
+        try:
+            df = self.load_draws()
+            return int((~df['DrawDate'].isin(self.processed_dates)).sum())
+        except Exception as e:
+            print(f"未処理抽選データ取得エラー: {e}")
+            return 0
+    
+    def iter_unprocessed_draws(self) -> Iterator[Dict]:
+        """
+        未処理の抽選データを1件ずつ返す
+        """
+        try:
+            df = self.load_draws()
             
-            return unprocessed
+            # 処理済みの日付を除外（開始時点の処理済み日付で判定）
+            unprocessed_df = df.loc[~df['DrawDate'].isin(self.processed_dates)]
+            draw_dates = unprocessed_df['DrawDate'].to_numpy()
+            # 実際の結果を取得
+            actual_results = unprocessed_df[NUMBER_COLUMNS].to_numpy()
         except Exception as e:
             print(f"未処理抽選データ取得エラー: {e}")
-            return []
+            return
+        
+        for draw_date, actual_result in zip(draw_dates, actual_results):
+            yield {'date': str(draw_date), 'actual_result': actual_result.tolist()}
+    
+    def _log(self, message: str = "", detail: bool = False):
+        """
+        処理ログを1行バッファに追加（detail=True の行は verbose の場合のみ）
+        """
+        if self.verbose or not detail:
+            self._log_buffer.write(message + "\n")
+    
+    def _flush_log(self):
+        """
+        バッファに溜めた処理ログをまとめて出力
+        """
+        if self._log_buffer.tell():
+            sys.stdout.write(self._log_buffer.getvalue())
+            sys.stdout.flush()
+            self._log_buffer.seek(0)
+            self._log_buffer.truncate()
+    
+    def _evaluate_draw(self, draw_date: str, actual_result: List[int]) -> Dict:
+        """
+        現在の重みで予測し、実際の結果と照合して評価を返す
+        
+        他モジュールの出力と順序が入れ替わらないよう、呼び出し前に処理ログを出力する
+        """
+        # 1. 特徴量抽出
+        self._log("📊 特徴量抽出中...", detail=True)
+        self._flush_log()
+        features = self.predictor.all_features
+        
+        # 2. 予測（現在の重みを使用）
+        self._log("🎯 予測生成中...", detail=True)
+        self._flush_log()
+        predictions = self.predictor.predict_numbers(num_candidates=20, num_predictions=6)
+        
+        # 予測結果を表示
+        if self.verbose:
+            self._log(f"\n📋 {draw_date} の予測結果:")
+            for i, (numbers, score) in enumerate(predictions, 1):
+                confidence = self.predictor.calculate_confidence_score(numbers, score)
+                sorted_numbers = sorted(numbers)
+                self._log(f"  パターン{i}: {sorted_numbers} (信頼度: {confidence:.1f}%)")
+        
+        # 3. 評価
+        self._log(f"\n📈 評価実行中...", detail=True)
+        self._flush_log()
+        evaluation = self.evaluator.evaluate_predictions(
+            draw_date, predictions, actual_result
+        )
+        if self.verbose:
+            self.evaluator.print_evaluation_summary(evaluation)
+        return features
+    
+    def _apply_learning(self, draw_date: str, features: Dict):
+        """
+        評価結果から重みを学習し、予測器に反映する
+        """
+        # 4. 学習
+        self._log(f"\n🧠 学習実行中...", detail=True)
+        self._flush_log()
+        self.learner.learn_from_evaluation(draw_date, features)
+        
+        # 5. 重みを再読み込み（学習後の重みを反映）
+        self.predictor.weights = self.learner.weights
+        self.predictor.update_weights_vec()
     
     def process_single_draw(self, draw_info: Dict) -> bool:
         """
         単一の抽選を処理
         
+        次の抽選の予測は直前の学習結果の重みに依存するため、
+        評価と学習は抽選ごとに順番に行う
+        
         Args:
             draw_info: 抽選情報 {'date': str, 'actual_result': List[int]}
             
@@ -84,49 +219,28 @@ class TotoLearningSystem:
         draw_date = draw_info['date']
         actual_result = draw_info['actual_result']
         
-        print(f"\n🔄 {draw_date} の処理開始")
-        print("=" * 60)
-        
+        # 処理ログはバッファに溜めてまとめて出力（verbose=False でも開始・完了は表示）
         try:
-            # 1. 特徴量抽出
-            print("📊 特徴量抽出中...")
-            features = self.predictor.all_features
+            self._log(f"\n🔄 {draw_date} の処理開始")
+            self._log("=" * 60)
             
-            # 2. 予測（現在の重みを使用）
-            print("🎯 予測生成中...")
-            predictions = self.predictor.predict_numbers(num_candidates=20, num_predictions=6)
-            
-            # 予測結果を表示
-            print(f"\n📋 {draw_date} の予測結果:")
-            for i, (numbers, score) in enumerate(predictions, 1):
-                confidence = self.predictor.calculate_confidence_score(numbers, score)
-                sorted_numbers = sorted(numbers)
-                print(f"  パターン{i}: {sorted_numbers} (信頼度: {confidence:.1f}%)")
-            
-            # 3. 評価
-            print(f"\n📈 評価実行中...")
-            evaluation = self.evaluator.evaluate_predictions(
-                draw_date, predictions, actual_result
-            )
-            self.evaluator.print_evaluation_summary(evaluation)
-            
-            # 4. 学習
-            print(f"\n🧠 学習実行中...")
-            self.learner.learn_from_evaluation(draw_date, features)
-            
-            # 5. 重みを再読み込み（学習後の重みを反映）
-            self.predictor.weights = self.learner.weights
-            
-            # 処理済みとして記録
-            self.processed_dates.add(draw_date)
-            self.save_processed_dates()
+            features = self._evaluate_draw(draw_date, actual_result)
+            self._apply_learning(draw_date, features)
             
-            print(f"✅ {draw_date} の処理完了")
-            return True
+            # 評価結果が追記ログに保存された後でのみ処理済みとして記録する
+            # （途中で中断しても、評価のない日付が処理済みにならない）
+            self.append_processed_date(draw_date)
             
+            self._log(f"✅ {draw_date} の処理完了")
         except Exception as e:
+            # エラーはバッファを介さずすぐに表示
+            self._flush_log()
             print(f"❌ {draw_date} の処理エラー: {e}")
             return False
+        finally:
+            # 中断された場合も溜めた処理ログを失わない
+            self._flush_log()
+        return True
     
     def run_learning_loop(self, max_draws=None):
         """
@@ -141,34 +255,42 @@ class TotoLearningSystem:
         # 現在の重み情報を表示
         self.predictor.print_weight_info()
         
-        # 未処理の抽選を取得
-        unprocessed = self.get_unprocessed_draws()
+        # 未処理の抽選数を取得
+        total = self.count_unprocessed_draws()
         
-        if not unprocessed:
+        if not total:
             print("✅ 処理済みの抽選はありません")
             return
         
-        print(f"📋 未処理抽選数: {len(unprocessed)}件")
+        print(f"📋 未処理抽選数: {total}件")
+        
+        # 未処理の抽選を1件ずつ取り出す
+        unprocessed = self.iter_unprocessed_draws()
         
         # 最大処理回数の制限
         if max_draws:
-            unprocessed = unprocessed[:max_draws]
-            print(f"📋 今回処理予定: {len(unprocessed)}件")
+            total = min(total, max_draws)
+            unprocessed = islice(unprocessed, max_draws)
+            print(f"📋 今回処理予定: {total}件")
         
         # 各抽選を順次処理
         success_count = 0
         for i, draw_info in enumerate(unprocessed, 1):
-            print(f"\n🔄 進捗: {i}/{len(unprocessed)}")
+            print(f"\n🔄 進捗: {i}/{total}")
             
             if self.process_single_draw(draw_info):
                 success_count += 1
             else:
                 print(f"⚠️ {draw_info['date']} の処理をスキップしました")
         
+        # 評価結果と処理済み日付をまとめて保存
+        self.evaluator.save_evaluation_results()
+        self.save_processed_dates()
+        
         # 最終結果を表示
         print(f"\n🎉 学習ループ完了")
         print("=" * 60)
-        print(f"処理成功: {success_count}/{len(unprocessed)}件")
+        print(f"処理成功: {success_count}/{total}件")
         
         # 最終的な重み情報を表示
         print("\n⚖️ 学習後の重み設定:")
@@ -230,6 +352,41 @@ class TotoLearningSystem:
             # 即座に学習処理を実行
             draw_info = {'date': draw_date, 'actual_result': actual_result}
             self.process_single_draw(draw_info)
+            self.evaluator.save_evaluation_results()
+            self.save_processed_dates()
+            
+            # 追加した結果を特徴量に反映（次回予測用）
+            self.predictor.features.update_with_draw(actual_result, draw_date)
+            self.predictor.calculate_features()
+            
+        except Exception as e:
+            print(f"❌ 実際の結果追加エラー: {e}")
+    
+    def add_actual_results(self, rows: List[Tuple[str, List[int]]]):
+        """
+        複数の実際の結果をまとめて追加
+        
+        Args:
+            rows: (抽選日, 実際の結果（6個の数字）) のリスト
+        """
+        if not rows:
+            return
+        
+        try:
+            # CSVファイルに一括追加
+            with open(self.csv_file, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerows([draw_date, '金'] + list(actual_result) for draw_date, actual_result in rows)
+            
+            print(f"✅ {len(rows)}件の実際の結果を追加しました")
+            
+            # 追加分を含む未処理抽選をまとめて学習
+            self.run_learning_loop()
+            
+            # 追加した結果を特徴量に反映し、再計算は1回だけ行う
+            for draw_date, actual_result in rows:
+                self.predictor.features.update_with_draw(actual_result, draw_date)
+            self.predictor.calculate_features()
             
         except Exception as e:
             print(f"❌ 実際の結果追加エラー: {e}")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+予測スクリプト共通のヘルパー（当選番号の読み込み・数字の判定表・数字選択）
+"""
+
+import csv
+import math
+
+import numpy as np
+import pandas as pd
+
+def _build_prime_mask(size=50):
+    """
+    エラトステネスの篩で素数判定表を作成
+    """
+    mask = np.ones(size, dtype=bool)
+    mask[:2] = False
+    for i in range(2, math.isqrt(size - 1) + 1):
+        if mask[i]:
+            mask[i * i::i] = False
+    return mask
+
+# 数字 -> 素数 の判定表（インデックス = 数字）
+PRIME_MASK = _build_prime_mask()
+# 数字 -> 範囲（0: 1-10, 1: 11-20, 2: 21-30, 3: 31-40, 4: 41-49）の対応表（インデックス = 数字）
+RANGE_ID = np.minimum(np.maximum(np.arange(50) - 1, 0) // 10, 4)
+
+def load_draw_numbers(path):
+    """
+    CSVの2-7列目（当選番号）を読み込み、6個すべてが1-49の整数である回のみを
+    int8 の行列 (抽選回数 x 6) で返す
+    """
+    try:
+        # 数値でない値は欠損扱い
+        df = pd.read_csv(path, usecols=range(1, 7), dtype=str, engine='c', on_bad_lines='skip')
+    except (ValueError, pd.errors.ParserError):
+        # 列が足りないCSVや崩れた行で一括読み込みできない場合は1行ずつ解析
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # ヘッダーをスキップ
+            rows = [row[1:7] for row in reader if len(row) >= 7]
+        df = pd.DataFrame(rows, columns=range(1, 7), dtype=str)
+    numbers = df.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64).reshape(-1, 6)
+    
+    # 6個すべてが1-49の整数である回のみ採用
+    valid = ((numbers >= 1) & (numbers <= 49) & (numbers == np.floor(numbers))).all(axis=1)
+    return np.ascontiguousarray(numbers[valid], dtype=np.int8)
+
+def top_k_indices(values, k):
+    """
+    スコア上位k個のインデックスを降順で返す（同点はインデックスの小さい順）
+    """
+    k = min(k, values.size)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    # k番目のスコアを部分選択で求め、境界の同点はインデックス順に採用
+    kth = np.partition(values, -k)[-k]
+    above = np.flatnonzero(values > kth)
+    ties = np.flatnonzero(values == kth)[:k - above.size]
+    indices = np.concatenate((above, ties))
+    return indices[np.argsort(-values[indices], kind='stable')]
+
+# 1パターンの数字の個数
+PICK_COUNT = 6
+
+def number_mask(numbers):
+    """
+    数字の集合をビットマスク（ビット位置 = 数字）に変換
+    """
+    mask = 0
+    for num in numbers:
+        mask |= 1 << num
+    return mask
+
+def fill_pattern(pattern, candidates):
+    """
+    候補を順に、重複を除いてPICK_COUNT個になるまで pattern に追加して返す
+    """
+    # 選択済みの数字はビットマスクで判定
+    mask = number_mask(pattern)
+    for num in candidates:
+        if len(pattern) >= PICK_COUNT:
+            break
+        bit = 1 << num
+        if not mask & bit:
+            mask |= bit
+            pattern.append(num)
+    return pattern
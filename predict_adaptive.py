@@ -5,6 +5,28 @@ import numpy as np
 import json
 from features import TotoFeatures
 import random
+from number_selection import RANGE_ID, top_k_indices
+
+# 分布区間の名前（RANGE_ID の区間番号順）
+INTERVAL_NAMES = ('1-10', '11-20', '21-30', '31-40', '41-49')
+
+# 1-49の素数と平方数
+PRIMES = frozenset({2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47})
+SQUARES = frozenset({1, 4, 9, 16, 25, 36, 49})
+
+# 重みベクトル・特徴量スコア行列の並び順
+FEATURE_ORDER = (
+    'total_appearances', 'recent_appearances', 'missing_intervals', 'hot_cold',
+    'periodicity', 'regression_trend', 'moving_average', 'attraction_effect',
+    'distribution', 'adjacent_correlation'
+)
+
+def score_all_numbers(feature_matrix, weights_vec):
+    """
+    特徴量スコア行列（特徴量 x 数字）を重み付きで合計し、全数字のスコアを返す
+    """
+    # 軸0の合計は特徴量の順に1行ずつ加算される
+    return np.add.reduce(weights_vec[:, np.newaxis] * feature_matrix, axis=0)
 
 class TotoPredictorAdaptive:
     def __init__(self, csv_file='totomaru.csv', weights_file='weights.json'):
@@ -14,7 +36,13 @@ class TotoPredictorAdaptive:
         self.features = TotoFeatures(csv_file)
         self.weights_file = weights_file
         self.all_features = None
+        # 数字ごとのスコアのキャッシュ（重み・特徴量が変わるまで再利用）
+        self._feature_scores = {}
+        self._feature_matrix = None
+        self._score_cache = None
+        self._score_cache_key = None
         self.weights = self.load_weights()
+        self.update_weights_vec()
         self.calculate_features()
         
     def load_weights(self):
@@ -48,161 +76,167 @@ class TotoPredictorAdaptive:
             print(f"重み読み込みエラー: {e}")
             return default_weights
         
+    def update_weights_vec(self):
+        """
+        重み辞書をFEATURE_ORDER順のベクトルに変換（重みを差し替えたら呼び出す）
+        """
+        self.weights_vec = np.array([self.weights[name] for name in FEATURE_ORDER], dtype=np.float64)
+        return self.weights_vec
+    
     def calculate_features(self):
         """
         全ての特徴量を計算
         """
         print("特徴量を計算中...")
         self.all_features = self.features.calculate_all_features()
+        self._build_feature_scores()
+        self._score_cache = None
         print("特徴量計算完了")
     
-    def calculate_number_score(self, number):
+    def get_number_scores(self):
         """
-        各数字の総合スコアを計算（重みを動的に適用）
+        全数字の総合スコアを取得（インデックス = 数字、現在の重みで1回だけ計算）
+        """
+        key = tuple(self.weights.items())
+        if self._score_cache is None or self._score_cache_key != key:
+            # 重みの辞書が直接書き換えられた場合もベクトルを同期
+            self.update_weights_vec()
+            # 特徴量ごとのスコアに重みを掛けて加算
+            scores = score_all_numbers(self._feature_matrix, self.weights_vec)
+            scores[0] = 0.0
+            self._score_cache = scores
+            self._score_cache_key = key
+        return self._score_cache
+    
+    def _build_feature_scores(self):
         """
-        score = 0.0
+        特徴量ごとの数字別スコア（重みを掛ける前、インデックス = 数字）を計算
+        """
+        features = self.all_features
+        n_draws = len(self.features.data)
+        
+        def number_array(feature, default, field=None):
+            values = np.full(50, default, dtype=np.float64)
+            for num, value in feature.items():
+                if 0 <= num < 50:
+                    values[num] = value.get(field, default) if field else value
+            return values
+        
+        feature_scores = {}
         
         # 1. 総出現回数スコア（回帰平均の法則）
-        total_appearances = self.all_features['total_appearances'].get(number, 0)
-        expected_appearances = len(self.features.data) * 6 / 49  # 理論期待値
-        appearance_score = 1.0 - abs(total_appearances - expected_appearances) / expected_appearances
-        score += self.weights['total_appearances'] * appearance_score
+        total_appearances = number_array(features['total_appearances'], 0)
+        expected_appearances = n_draws * 6 / 49  # 理論期待値
+        feature_scores['total_appearances'] = 1.0 - np.abs(total_appearances - expected_appearances) / expected_appearances
         
         # 2. 直近出現回数スコア（マルコフ連鎖）
-        recent_appearances = self.all_features['recent_appearances'].get(number, 0)
-        recent_score = min(recent_appearances / 3.0, 1.0)  # 直近10回で3回以上なら高スコア
-        score += self.weights['recent_appearances'] * recent_score
+        recent_appearances = number_array(features['recent_appearances'], 0)
+        feature_scores['recent_appearances'] = np.minimum(recent_appearances / 3.0, 1.0)  # 直近10回で3回以上なら高スコア
         
         # 3. 未出間隔スコア（回帰平均の法則）
-        missing_interval = self.all_features['missing_intervals'].get(number, 0)
-        avg_interval = len(self.features.data) * 6 / 49  # 平均間隔
-        if missing_interval > avg_interval * 1.5:  # 長期間未出なら高スコア
-            interval_score = min(missing_interval / (avg_interval * 2), 1.0)
-        else:
-            interval_score = 0.3
-        score += self.weights['missing_intervals'] * interval_score
-        
-        # 4. ホット・コールドスコア
-        hot_numbers = self.all_features['hot_cold']['hot']
-        cold_numbers = self.all_features['hot_cold']['cold']
-        if number in hot_numbers:
-            hot_cold_score = 0.7  # ホット数字は中程度のスコア
-        elif number in cold_numbers:
-            hot_cold_score = 0.8  # コールド数字は高スコア（回帰期待）
-        else:
-            hot_cold_score = 0.5  # 中立
-        score += self.weights['hot_cold'] * hot_cold_score
+        missing_intervals = number_array(features['missing_intervals'], 0)
+        avg_interval = n_draws * 6 / 49  # 平均間隔
+        feature_scores['missing_intervals'] = np.where(
+            missing_intervals > avg_interval * 1.5,  # 長期間未出なら高スコア
+            np.minimum(missing_intervals / (avg_interval * 2), 1.0),
+            0.3
+        )
+        
+        # 4. ホット・コールドスコア（ホット 0.7、コールド 0.8（回帰期待）、中立 0.5）
+        hot_cold = np.full(50, 0.5)
+        hot_cold[[num for num in features['hot_cold']['cold'] if 0 <= num < 50]] = 0.8
+        hot_cold[[num for num in features['hot_cold']['hot'] if 0 <= num < 50]] = 0.7
+        feature_scores['hot_cold'] = hot_cold
         
         # 5. 周期性スコア
-        periodicity = self.all_features['periodicity'].get(number, {})
-        if periodicity.get('avg_interval', float('inf')) != float('inf'):
-            current_interval = self.all_features['missing_intervals'].get(number, 0)
-            expected_interval = periodicity['avg_interval']
-            if abs(current_interval - expected_interval) <= periodicity.get('std_interval', 1):
-                periodicity_score = 0.9  # 周期性に一致
-            else:
-                periodicity_score = 0.3
-        else:
-            periodicity_score = 0.5
-        score += self.weights['periodicity'] * periodicity_score
-        
-        # 6. 回帰トレンドスコア
-        trend = self.all_features['regression_trend'].get(number, {})
-        if trend.get('r_squared', 0) > 0.3:  # 有意なトレンドがある場合
-            if trend.get('slope', 0) > 0:
-                trend_score = 0.8  # 上昇トレンド
-            else:
-                trend_score = 0.6  # 下降トレンド
-        else:
-            trend_score = 0.5  # トレンドなし
-        score += self.weights['regression_trend'] * trend_score
-        
-        # 7. 移動平均スコア
-        moving_avg = self.all_features['moving_average'].get(number, {})
-        if moving_avg.get('trend_direction') == 'up':
-            ma_score = 0.7
-        elif moving_avg.get('trend_direction') == 'down':
-            ma_score = 0.8  # 下降トレンドは回帰期待で高スコア
-        else:
-            ma_score = 0.5
-        score += self.weights['moving_average'] * ma_score
+        avg_intervals = number_array(features['periodicity'], float('inf'), 'avg_interval')
+        std_intervals = number_array(features['periodicity'], 1, 'std_interval')
+        periodic = np.abs(missing_intervals - avg_intervals) <= std_intervals  # 周期性に一致
+        feature_scores['periodicity'] = np.where(
+            np.isinf(avg_intervals), 0.5, np.where(periodic, 0.9, 0.3)
+        )
+        
+        # 6. 回帰トレンドスコア（上昇 0.8、下降 0.6、トレンドなし 0.5）
+        r_squared = number_array(features['regression_trend'], 0, 'r_squared')
+        slopes = number_array(features['regression_trend'], 0, 'slope')
+        feature_scores['regression_trend'] = np.where(
+            r_squared > 0.3, np.where(slopes > 0, 0.8, 0.6), 0.5
+        )
+        
+        # 7. 移動平均スコア（下降トレンドは回帰期待で高スコア）
+        moving_average = np.full(50, 0.5)
+        for num, moving_avg in features['moving_average'].items():
+            if 0 <= num < 50:
+                direction = moving_avg.get('trend_direction')
+                if direction == 'up':
+                    moving_average[num] = 0.7
+                elif direction == 'down':
+                    moving_average[num] = 0.8
+        feature_scores['moving_average'] = moving_average
         
         # 8. 引き寄せ効果スコア
-        attraction = self.all_features['attraction_effect'].get(number, {})
-        if attraction.get('attraction_strength', 0) > 2:  # 強い引き寄せ効果
-            attraction_score = 0.8
-        else:
-            attraction_score = 0.5
-        score += self.weights['attraction_effect'] * attraction_score
-        
-        # 9. 分布バランススコア
-        distribution = self.all_features['distribution']
-        if 1 <= number <= 10:
-            interval = '1-10'
-        elif 11 <= number <= 20:
-            interval = '11-20'
-        elif 21 <= number <= 30:
-            interval = '21-30'
-        elif 31 <= number <= 40:
-            interval = '31-40'
-        else:
-            interval = '41-49'
-        
-        interval_rate = distribution.get(interval, 0.2)
-        if interval_rate < 0.15:  # 低出現区間なら高スコア
-            distribution_score = 0.8
-        elif interval_rate > 0.25:  # 高出現区間なら低スコア
-            distribution_score = 0.3
-        else:
-            distribution_score = 0.5
-        score += self.weights['distribution'] * distribution_score
+        strengths = number_array(features['attraction_effect'], 0, 'attraction_strength')
+        feature_scores['attraction_effect'] = np.where(strengths > 2, 0.8, 0.5)  # 強い引き寄せ効果
+        
+        # 9. 分布バランススコア（低出現区間なら高スコア、高出現区間なら低スコア）
+        distribution = features['distribution']
+        interval_rates = np.array([distribution.get(name, 0.2) for name in INTERVAL_NAMES])[RANGE_ID]
+        feature_scores['distribution'] = np.where(
+            interval_rates < 0.15, 0.8, np.where(interval_rates > 0.25, 0.3, 0.5)
+        )
         
         # 10. 隣接相関スコア
-        adjacent_corr = self.all_features['adjacent_correlation']
-        if adjacent_corr.get(1, 0) > 0.1 or adjacent_corr.get(2, 0) > 0.1:
-            adjacent_score = 0.6
-        else:
-            adjacent_score = 0.5
-        score += self.weights['adjacent_correlation'] * adjacent_score
-        
-        return score
+        adjacent_corr = features['adjacent_correlation']
+        adjacent_score = 0.6 if adjacent_corr.get(1, 0) > 0.1 or adjacent_corr.get(2, 0) > 0.1 else 0.5
+        feature_scores['adjacent_correlation'] = np.full(50, adjacent_score)
+        
+        self._feature_scores = feature_scores
+        self._feature_matrix = np.vstack([feature_scores[name] for name in FEATURE_ORDER])
+    
+    def calculate_number_score(self, number):
+        """
+        各数字の総合スコアを計算（重みを動的に適用）
+        """
+        return float(self.get_number_scores()[number])
     
-    def calculate_combination_score(self, numbers):
+    def calculate_combination_score(self, numbers, presorted=False):
         """
-        数字の組み合わせスコアを計算
+        数字の組み合わせスコアを計算（presorted=True なら numbers は昇順済み）
         """
         if len(numbers) != 6:
             return 0.0
         
+        # 合計・奇数・区間・連番・素数・平方数を1回の走査で集計
+        total = 0
+        odd_count = 0
+        intervals = [0] * 5
+        consecutive_count = 0
+        prime_count = 0
+        square_count = 0
+        previous = None
+        for num in (numbers if presorted else sorted(numbers)):
+            total += num
+            odd_count += num & 1
+            intervals[RANGE_ID[num]] += 1
+            if previous is not None and num - previous == 1:
+                consecutive_count += 1
+            prime_count += num in PRIMES
+            square_count += num in SQUARES
+            previous = num
+        
         combination_score = 0.0
         
         # 1. 合計値の最適化
-        total = sum(numbers)
         optimal_total = 147  # 1-49の平均 * 6
         total_score = 1.0 - abs(total - optimal_total) / optimal_total
         combination_score += 0.2 * total_score
         
         # 2. 奇数・偶数のバランス
-        odd_count = sum(1 for num in numbers if num % 2 == 1)
         even_count = 6 - odd_count
         balance_score = 1.0 - abs(odd_count - even_count) / 6.0
         combination_score += 0.15 * balance_score
         
-        # 3. 区間分布のバランス
-        intervals = [0] * 5
-        for num in numbers:
-            if 1 <= num <= 10:
-                intervals[0] += 1
-            elif 11 <= num <= 20:
-                intervals[1] += 1
-            elif 21 <= num <= 30:
-                intervals[2] += 1
-            elif 31 <= num <= 40:
-                intervals[3] += 1
-            else:
-                intervals[4] += 1
-        
-        # 各区間に1-2個の数字があるのが理想的
+        # 3. 区間分布のバランス（各区間に1-2個の数字があるのが理想的）
         distribution_score = 0.0
         for count in intervals:
             if 1 <= count <= 2:
@@ -215,34 +249,14 @@ class TotoPredictorAdaptive:
         combination_score += 0.15 * distribution_score
         
         # 4. 連番の回避
-        sorted_numbers = sorted(numbers)
-        consecutive_count = 0
-        for i in range(len(sorted_numbers) - 1):
-            if sorted_numbers[i+1] - sorted_numbers[i] == 1:
-                consecutive_count += 1
-        
         consecutive_score = 1.0 - (consecutive_count / 3.0)  # 連番が少ないほど高スコア
         combination_score += 0.1 * consecutive_score
         
         # 5. 素数のバランス
-        def is_prime(n):
-            if n < 2:
-                return False
-            for i in range(2, int(n**0.5) + 1):
-                if n % i == 0:
-                    return False
-            return True
-        
-        prime_count = sum(1 for num in numbers if is_prime(num))
         prime_score = 1.0 - abs(prime_count - 2) / 6.0  # 素数2個が理想的
         combination_score += 0.1 * prime_score
         
         # 6. 平方数のバランス
-        def is_square(n):
-            root = int(n**0.5)
-            return root * root == n
-        
-        square_count = sum(1 for num in numbers if is_square(num))
         square_score = 1.0 - abs(square_count - 1) / 6.0  # 平方数1個が理想的
         combination_score += 0.1 * square_score
         
@@ -253,37 +267,49 @@ class TotoPredictorAdaptive:
         数字を予測
         """
         # 各数字のスコアを計算
-        number_scores = {}
-        for num in range(1, 50):
-            number_scores[num] = self.calculate_number_score(num)
+        scores = self.get_number_scores()
+        number_scores = dict(zip(range(1, 50), scores[1:].tolist()))
         
         # スコアの高い数字から候補を選択
-        sorted_numbers = sorted(number_scores.items(), key=lambda x: x[1], reverse=True)
-        candidates = [num for num, score in sorted_numbers[:num_candidates]]
+        candidates = (top_k_indices(scores[1:], num_candidates) + 1).tolist()
+        
+        # 候補の選択の重み（スコアに比例、正のスコアが6個未満なら一様）
+        candidate_weights = [max(number_scores[c], 0.0) for c in candidates]
+        if sum(1 for w in candidate_weights if w > 0) < 6:
+            candidate_weights = None
         
         # 組み合わせを生成
         predictions = []
+        seen = set()
         attempts = 0
         max_attempts = num_predictions * 100
         
         while len(predictions) < num_predictions and attempts < max_attempts:
-            # 候補から6個をランダムに選択
-            selected = random.sample(candidates, 6)
+            attempts += 1
             
-            # 組み合わせスコアを計算
-            combination_score = self.calculate_combination_score(selected)
+            # 候補からスコアで重み付けして6個を選択（random.seed で再現できるよう random を使用）
+            if candidate_weights is None:
+                selected = sorted(random.sample(candidates, 6))
+            else:
+                pool = list(range(len(candidates)))
+                weights = list(candidate_weights)
+                selected = []
+                for _ in range(6):
+                    # 選んだ候補を除いて重み付きで1個ずつ選ぶ（非復元抽出）
+                    pos = random.choices(range(len(pool)), weights=weights)[0]
+                    selected.append(candidates[pool.pop(pos)])
+                    weights.pop(pos)
+                selected.sort()
             
             # 重複チェック
-            is_duplicate = False
-            for existing_numbers, _ in predictions:
-                if set(selected) == set(existing_numbers):
-                    is_duplicate = True
-                    break
-            
-            if not is_duplicate:
-                predictions.append((selected, combination_score))
+            key = frozenset(selected)
+            if key in seen:
+                continue
+            seen.add(key)
             
-            attempts += 1
+            # 組み合わせスコアを計算
+            combination_score = self.calculate_combination_score(selected, presorted=True)
+            predictions.append((selected, combination_score))
         
         # 組み合わせスコアでソート
         predictions.sort(key=lambda x: x[1], reverse=True)
@@ -298,7 +324,6 @@ class TotoPredictorAdaptive:
         
         for num in numbers:
             num_reasons = []
-            score = self.calculate_number_score(num)
             
             # 各特徴量の貢献度を分析
             total_appearances = self.all_features['total_appearances'].get(num, 0)
@@ -329,7 +354,7 @@ class TotoPredictorAdaptive:
         信頼度スコアを計算
         """
         # 個別スコアの平均
-        individual_scores = [self.calculate_number_score(num) for num in numbers]
+        individual_scores = self.get_number_scores()[list(numbers)]
         avg_individual_score = np.mean(individual_scores)
         
         # 組み合わせスコア
@@ -4,74 +4,59 @@
 簡易版Toto丸くん - 2023-09-21予測
 """
 
-import csv
 import json
 import random
-from collections import Counter
+import numpy as np
+import pandas as pd
+
+from number_selection import top_k_indices
+
+NUMBER_COLUMNS = ('Number1', 'Number2', 'Number3', 'Number4', 'Number5', 'Number6')
 
 def load_data():
     """CSVデータを読み込み"""
-    data = []
     try:
-        with open('totomaru.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                numbers = [int(row[f'Number{i}']) for i in range(1, 7)]
-                data.append({
-                    'date': row['DrawDate'],
-                    'numbers': numbers,
-                    'bonus': int(row['Additional'])
-                })
+        # 必要な列だけを型指定して列単位で読み込む
+        dtypes = {col: np.int8 for col in NUMBER_COLUMNS}
+        dtypes.update({'DrawDate': str, 'Additional': np.int8})
+        df = pd.read_csv('totomaru.csv', usecols=list(dtypes), dtype=dtypes)
     except FileNotFoundError:
         print(f"⚠️ totomaru.csvが見つかりません")
         return []
-    return data
+    
+    numbers = df[list(NUMBER_COLUMNS)].to_numpy().tolist()
+    return [
+        {'date': date, 'numbers': nums, 'bonus': bonus}
+        for date, nums, bonus in zip(df['DrawDate'].tolist(), numbers, df['Additional'].tolist())
+    ]
 
 def calculate_scores(data):
     """スコア計算"""
     if not data:
         return {}
     
-    # 基本統計
-    all_numbers = []
-    recent_numbers = []
-    
-    for entry in data:
-        all_numbers.extend(entry['numbers'])
-        # 最近10回分
-        if len(recent_numbers) < 60:
-            recent_numbers.extend(entry['numbers'])
-    
-    # 出現回数
-    total_counts = Counter(all_numbers)
-    recent_counts = Counter(recent_numbers)
-    
-    # 欠損間隔
-    missing_intervals = {}
-    current_draw = len(data)
-    
-    for num in range(1, 50):
-        last_appearance = None
-        for i, entry in enumerate(reversed(data)):
-            if num in entry['numbers']:
-                last_appearance = current_draw - i
-                break
-        
-        if last_appearance is None:
-            missing_intervals[num] = current_draw
-        else:
-            missing_intervals[num] = current_draw - last_appearance
-    
-    # スコア計算
-    scores = {}
-    for num in range(1, 50):
-        score = (
-            total_counts[num] * 0.15 * 10 +
-            recent_counts[num] * 0.20 * 15 +
-            missing_intervals.get(num, 0) * 0.20 * 20 +
-            random.uniform(0, 10)  # ランダム要素
-        )
-        scores[num] = max(0, score)
+    # 当選番号の行列 (抽選回数 x 6)、最後の行が最新回
+    nums = np.array([entry['numbers'] for entry in data], dtype=np.intp)
+    current_draw = len(nums)
+    
+    # 出現回数（最近10回分）
+    total_counts = np.bincount(nums.ravel(), minlength=50)
+    recent_counts = np.bincount(nums[-10:].ravel(), minlength=50)
+    
+    # 欠損間隔（最新回から遡って初めて出現した位置、未出現は抽選回数）
+    missing_intervals = np.full(50, current_draw)
+    draws_ago = np.repeat(np.arange(current_draw - 1, -1, -1), nums.shape[1])
+    np.minimum.at(missing_intervals, nums.ravel(), draws_ago)
+    
+    # スコア計算（ランダム要素は数字1から順に生成）
+    noise = np.array([random.uniform(0, 10) for _ in range(49)])
+    score_vec = (
+        total_counts[1:] * 0.15 * 10 +
+        recent_counts[1:] * 0.20 * 15 +
+        missing_intervals[1:] * 0.20 * 20 +
+        noise
+    )
+    scores = dict(zip(range(1, 50), np.maximum(score_vec, 0).tolist()))
     
     return scores
 
@@ -81,8 +66,10 @@ def generate_patterns(scores):
         return []
     
     # 上位スコアの数字を取得
-    top_numbers = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:20]
-    top_numbers = [num for num, score in top_numbers]
+    # 部分選択で上位20個を求め、その中だけをスコア降順に並べる（同点は元の順）
+    numbers = list(scores)
+    values = np.fromiter(scores.values(), dtype=np.float64, count=len(numbers))
+    top_numbers = [numbers[i] for i in top_k_indices(values, 20)]
     
     patterns = []
     strategies = [
@@ -1,16 +1,93 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import csv
+import json
 import os
+import re
 import sys
 from datetime import datetime, timedelta
-from collections import Counter
+
+import numpy as np
+
+from number_selection import PICK_COUNT, PRIME_MASK, RANGE_ID, fill_pattern, load_draw_numbers, number_mask
+
+# 数字 -> 奇数/5の倍数 の判定表（インデックス = 数字）
+ODD_MASK = np.arange(50) % 2 == 1
+MULT5_MASK = (np.arange(50) % 5 == 0) & (np.arange(50) > 0)
+# 範囲内の個数 -> 範囲バランスの加点（2個以下 +10、3個 +5、4個以上 -5）
+RANGE_BALANCE_POINTS = np.array([10, 10, 10, 5, -5, -5, -5])
+
+# 合計値重視パターンの目標
+TARGET_SUM = 150
+TARGET_SUM_TOLERANCE = 50
+
+def _pattern_recent(recent_ranking):
+    """パターン1: 最近出現重視"""
+    return sorted(recent_ranking[:PICK_COUNT].tolist())
+
+def _pattern_high_score(order):
+    """パターン2: 高スコア重視"""
+    return sorted(order[:PICK_COUNT].tolist())
+
+def _pattern_range_balance(order):
+    """パターン3: 範囲バランス重視（各範囲の上位3個から）"""
+    pattern = []
+    order_ranges = RANGE_ID[order]
+    for range_index in range(5):
+        fill_pattern(pattern, order[order_ranges == range_index][:3].tolist())
+    return sorted(pattern)
+
+def _pattern_consecutive(order, scores_arr):
+    """パターン4: 連続数字重視"""
+    # 隣り合う2数字（1-2 ... 48-49）の合計スコア上位5組
+    pair_scores = scores_arr[1:-1] + scores_arr[2:]
+    best_pairs = np.argsort(-pair_scores, kind='stable')[:5] + 1
+    pattern = fill_pattern([], np.column_stack((best_pairs, best_pairs + 1)).ravel().tolist())
+    # 残りを高スコアで補充
+    return sorted(fill_pattern(pattern, order.tolist()))
+
+def _pattern_odd_even(order):
+    """パターン5: 奇数/偶数バランス（奇数・偶数の上位3個ずつ）"""
+    odd_numbers = order[ODD_MASK[order]][:3].tolist()
+    even_numbers = order[~ODD_MASK[order]][:3].tolist()
+    pattern = []
+    for odd_num, even_num in zip(odd_numbers, even_numbers):
+        pattern.append(odd_num)
+        pattern.append(even_num)
+    return sorted(pattern)
+
+def _pattern_multiple_5(order):
+    """パターン6: 5の倍数重視"""
+    pattern = fill_pattern([], order[MULT5_MASK[order]][:8].tolist())
+    # 残りを高スコアで補充
+    return sorted(fill_pattern(pattern, order.tolist()))
+
+def _pattern_target_sum(order):
+    """パターン7: 合計値重視"""
+    pattern = []
+    total = 0
+    # order は重複がないため選択済みの判定は不要
+    for num in order[:20].tolist():
+        if len(pattern) >= PICK_COUNT:
+            break
+        if len(pattern) < PICK_COUNT - 1 or abs(total + num - TARGET_SUM) <= TARGET_SUM_TOLERANCE:
+            pattern.append(num)
+            total += num
+    return sorted(pattern)
+
+def _pattern_prime(order):
+    """パターン8: 素数重視"""
+    pattern = fill_pattern([], order[PRIME_MASK[order]][:10].tolist())
+    # 残りを高スコアで補充
+    return sorted(fill_pattern(pattern, order.tolist()))
 
 class TotoPredictor:
     def __init__(self):
         self.csv_file = 'totomaru.csv'
         self.results_dir = 'results'
+        self.data = None
+        # 読み込み済みCSVの識別キー（パス, 更新時刻, サイズ）
+        self._data_key = None
         self.ensure_results_dir()
     
     def ensure_results_dir(self):
@@ -20,215 +97,81 @@ class TotoPredictor:
     
     def load_data(self):
         """CSVデータの読み込み"""
-        data = []
         try:
-            with open(self.csv_file, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                next(reader)  # ヘッダーをスキップ
-                for row in reader:
-                    if len(row) >= 7:
-                        numbers = []
-                        for i in range(1, 7):
-                            try:
-                                num = int(row[i])
-                                if 1 <= num <= 49:
-                                    numbers.append(num)
-                            except ValueError:
-                                continue
-                        if len(numbers) == 6:
-                            data.append(numbers)
-            print(f"✅ {len(data)}回分のデータを読み込みました")
-            return data
+            # CSVが前回の読み込みから変わっていなければ再解析しない
+            stat = os.stat(self.csv_file)
+            cache_key = (self.csv_file, stat.st_mtime_ns, stat.st_size)
+            if self._data_key == cache_key:
+                print(f"✅ {len(self.data)}回分のデータを読み込みました")
+                return self.data
+            
+            # 当選番号の行列 (抽選回数 x 6)、1-49なので int8 で連続配置
+            data = load_draw_numbers(self.csv_file)
         except FileNotFoundError:
             print(f"❌ {self.csv_file}が見つかりません")
-            return []
+            return np.empty((0, 6), dtype=np.int8)
+        
+        self.data = data
+        self._data_key = cache_key
+        print(f"✅ {len(self.data)}回分のデータを読み込みました")
+        return self.data
     
     def calculate_scores(self, data):
         """スコア計算（学習結果を反映）"""
-        all_numbers = []
-        for draw in data:
-            all_numbers.extend(draw)
-        number_counts = Counter(all_numbers)
-        
-        recent_data = data[-10:] if len(data) >= 10 else data
-        recent_numbers = []
-        for draw in recent_data:
-            recent_numbers.extend(draw)
-        recent_counts = Counter(recent_numbers)
-        
-        scores = {}
-        for num in range(1, 50):
-            total_count = number_counts.get(num, 0)
-            recent_count = recent_counts.get(num, 0)
-            
-            last_appearance = 0
-            for i, draw in enumerate(reversed(data)):
-                if num in draw:
-                    last_appearance = i + 1
-                    break
-            
-            # 学習結果を反映したスコア計算
-            score = 0
-            score += total_count * 2
-            score += recent_count * 8  # 最近出現重視
-            score += max(0, 20 - last_appearance) * 3
-            
-            if recent_count >= 2:
-                score += 15  # ホット数字
-            elif last_appearance >= 15:
-                score += 15  # コールド数字
-            
-            scores[num] = score
-        
-        return scores, recent_counts
+        draws = np.asarray(data).reshape(-1, 6)
+        recent_draws = draws[-10:]
+        
+        # 最新回から遡った並び1本から、全体・最近10回の出現回数と最終出現を求める
+        latest_first = draws[::-1].ravel()
+        number_counts = np.bincount(latest_first, minlength=50)
+        recent_counts_arr = np.bincount(latest_first[:recent_draws.size], minlength=50)
+        
+        # 最後に出現してからの回数（最新回 = 1、未出現 = 0）
+        last_appearance = np.zeros(50, dtype=np.int64)
+        seen_numbers, first_position = np.unique(latest_first, return_index=True)
+        last_appearance[seen_numbers] = first_position // draws.shape[1] + 1
+        
+        # 学習結果を反映したスコア計算
+        score_arr = (
+            number_counts * 2
+            + recent_counts_arr * 8  # 最近出現重視
+            + np.maximum(0, 20 - last_appearance) * 3
+        )
+        # ホット数字・コールド数字
+        score_arr += 15 * ((recent_counts_arr >= 2) | (last_appearance >= 15))
+        
+        score_arr[0] = 0  # 0は数字ではない
+        
+        # 最近10回に出現した数字を出現回数の多い順に（同数は最近10回で先に出現した順）
+        recent_numbers, first_index = np.unique(recent_draws.ravel(), return_index=True)
+        recent_numbers = recent_numbers[np.argsort(first_index)]
+        recent_ranking = recent_numbers[np.argsort(-recent_counts_arr[recent_numbers], kind='stable')]
+        
+        return score_arr, recent_ranking
     
-    def generate_patterns(self, scores, recent_counts):
-        """予測パターンの生成"""
-        sorted_numbers = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+    def generate_patterns(self, scores_arr, recent_ranking):
+        """予測パターンの生成（scores_arr: 数字ごとのスコア、インデックス = 数字）"""
+        # スコア降順の数字（同点は数字の小さい順）を1回だけ求め、各パターンで使い回す
+        order = np.argsort(-scores_arr[1:], kind='stable') + 1
+        
+        candidates = [
+            (_pattern_recent(recent_ranking), "最近出現重視"),
+            (_pattern_high_score(order), "高スコア重視"),
+            (_pattern_range_balance(order), "範囲バランス重視"),
+            (_pattern_consecutive(order, scores_arr), "連続数字重視"),
+            (_pattern_odd_even(order), "奇数/偶数バランス"),
+            (_pattern_multiple_5(order), "5の倍数重視"),
+            (_pattern_target_sum(order), "合計値重視"),
+            (_pattern_prime(order), "素数重視"),
+        ]
+        
         patterns = []
         used_combinations = set()
-        
-        # パターン1: 最近出現重視
-        recent_favored = sorted(recent_counts.items(), key=lambda x: x[1], reverse=True)
-        pattern1 = []
-        for num, _ in recent_favored[:15]:
-            if len(pattern1) < 6 and num not in pattern1:
-                pattern1.append(num)
-        pattern1.sort()
-        if tuple(pattern1) not in used_combinations:
-            used_combinations.add(tuple(pattern1))
-            confidence = self.calculate_confidence(pattern1, scores)
-            patterns.append((pattern1, confidence, "最近出現重視"))
-        
-        # パターン2: 高スコア重視
-        pattern2 = []
-        for num, _ in sorted_numbers[:15]:
-            if len(pattern2) < 6:
-                pattern2.append(num)
-        pattern2.sort()
-        if tuple(pattern2) not in used_combinations:
-            used_combinations.add(tuple(pattern2))
-            confidence = self.calculate_confidence(pattern2, scores)
-            patterns.append((pattern2, confidence, "高スコア重視"))
-        
-        # パターン3: 範囲バランス重視
-        pattern3 = []
-        ranges = [(1,10), (11,20), (21,30), (31,40), (41,49)]
-        for start, end in ranges:
-            range_numbers = [(num, scores[num]) for num in range(start, end+1)]
-            range_numbers.sort(key=lambda x: x[1], reverse=True)
-            for num, _ in range_numbers[:3]:
-                if len(pattern3) < 6 and num not in pattern3:
-                    pattern3.append(num)
-        pattern3.sort()
-        if tuple(pattern3) not in used_combinations:
-            used_combinations.add(tuple(pattern3))
-            confidence = self.calculate_confidence(pattern3, scores)
-            patterns.append((pattern3, confidence, "範囲バランス重視"))
-        
-        # パターン4: 連続数字重視
-        pattern4 = []
-        consecutive_candidates = []
-        for i in range(1, 48):
-            if i in scores and i+1 in scores:
-                consecutive_score = scores[i] + scores[i+1]
-                consecutive_candidates.append((i, consecutive_score))
-                consecutive_candidates.append((i+1, consecutive_score))
-        
-        consecutive_candidates.sort(key=lambda x: x[1], reverse=True)
-        for num, _ in consecutive_candidates[:10]:
-            if len(pattern4) < 6 and num not in pattern4:
-                pattern4.append(num)
-        
-        for num, _ in sorted_numbers:
-            if len(pattern4) < 6 and num not in pattern4:
-                pattern4.append(num)
-        
-        pattern4.sort()
-        if tuple(pattern4) not in used_combinations:
-            used_combinations.add(tuple(pattern4))
-            confidence = self.calculate_confidence(pattern4, scores)
-            patterns.append((pattern4, confidence, "連続数字重視"))
-        
-        # パターン5: 奇数/偶数バランス
-        odd_numbers = [(num, scores[num]) for num in range(1, 50) if num % 2 == 1]
-        even_numbers = [(num, scores[num]) for num in range(1, 50) if num % 2 == 0]
-        odd_numbers.sort(key=lambda x: x[1], reverse=True)
-        even_numbers.sort(key=lambda x: x[1], reverse=True)
-        
-        pattern5 = []
-        for i in range(3):
-            if i < len(odd_numbers):
-                pattern5.append(odd_numbers[i][0])
-            if i < len(even_numbers):
-                pattern5.append(even_numbers[i][0])
-        pattern5.sort()
-        if tuple(pattern5) not in used_combinations:
-            used_combinations.add(tuple(pattern5))
-            confidence = self.calculate_confidence(pattern5, scores)
-            patterns.append((pattern5, confidence, "奇数/偶数バランス"))
-        
-        # パターン6: 5の倍数重視
-        multiple_5_numbers = [(num, scores[num]) for num in range(1, 50) if num % 5 == 0]
-        multiple_5_numbers.sort(key=lambda x: x[1], reverse=True)
-        
-        pattern6 = []
-        for num, _ in multiple_5_numbers[:8]:
-            if len(pattern6) < 6 and num not in pattern6:
-                pattern6.append(num)
-        
-        # 残りを高スコアで補充
-        for num, _ in sorted_numbers:
-            if len(pattern6) < 6 and num not in pattern6:
-                pattern6.append(num)
-        
-        pattern6.sort()
-        if tuple(pattern6) not in used_combinations:
-            used_combinations.add(tuple(pattern6))
-            confidence = self.calculate_confidence(pattern6, scores)
-            patterns.append((pattern6, confidence, "5の倍数重視"))
-        
-        # パターン7: 合計値重視
-        pattern7 = []
-        target_sum = 150
-        for num, _ in sorted_numbers[:20]:
-            if len(pattern7) < 6 and num not in pattern7:
-                current_sum = sum(pattern7) + num
-                if len(pattern7) < 5 or abs(current_sum - target_sum) <= 50:
-                    pattern7.append(num)
-        pattern7.sort()
-        if tuple(pattern7) not in used_combinations:
-            used_combinations.add(tuple(pattern7))
-            confidence = self.calculate_confidence(pattern7, scores)
-            patterns.append((pattern7, confidence, "合計値重視"))
-        
-        # パターン8: 素数重視
-        def is_prime(n):
-            if n < 2:
-                return False
-            for i in range(2, int(n**0.5) + 1):
-                if n % i == 0:
-                    return False
-            return True
-        
-        prime_numbers = [(num, scores[num]) for num in range(1, 50) if is_prime(num)]
-        prime_numbers.sort(key=lambda x: x[1], reverse=True)
-        
-        pattern8 = []
-        for num, _ in prime_numbers[:10]:
-            if len(pattern8) < 6 and num not in pattern8:
-                pattern8.append(num)
-        
-        # 残りを高スコアで補充
-        for num, _ in sorted_numbers:
-            if len(pattern8) < 6 and num not in pattern8:
-                pattern8.append(num)
-        
-        pattern8.sort()
-        if tuple(pattern8) not in used_combinations:
-            used_combinations.add(tuple(pattern8))
-            confidence = self.calculate_confidence(pattern8, scores)
-            patterns.append((pattern8, confidence, "素数重視"))
+        for pattern, strategy in candidates:
+            if tuple(pattern) not in used_combinations:
+                used_combinations.add(tuple(pattern))
+                confidence = self.calculate_confidence(pattern, scores_arr)
+                patterns.append((pattern, confidence, strategy))
         
         # 信頼度順にソート
         patterns.sort(key=lambda x: x[1], reverse=True)
@@ -236,31 +179,19 @@ class TotoPredictor:
         # 上位6パターンのみを返す
         return patterns[:6]
     
-    def calculate_confidence(self, numbers, scores):
-        """信頼度を計算"""
-        individual_score = sum(scores[num] for num in numbers)
+    def calculate_confidence(self, numbers, scores_arr):
+        """信頼度を計算（scores_arr: 数字ごとのスコア、インデックス = 数字）"""
+        number_idx = np.asarray(numbers)
+        individual_score = scores_arr[number_idx].sum()
         
         combo_score = 0
         
         # 範囲バランス
-        ranges = [(1,10), (11,20), (21,30), (31,40), (41,49)]
-        range_counts = [0] * 5
-        for num in numbers:
-            for i, (start, end) in enumerate(ranges):
-                if start <= num <= end:
-                    range_counts[i] += 1
-                    break
-        
-        for count in range_counts:
-            if count <= 2:
-                combo_score += 10
-            elif count == 3:
-                combo_score += 5
-            else:
-                combo_score -= 5
+        range_counts = np.bincount(RANGE_ID[number_idx], minlength=5)
+        combo_score += int(RANGE_BALANCE_POINTS[range_counts].sum())
         
         # 奇数/偶数バランス
-        odd_count = sum(1 for num in numbers if num % 2 == 1)
+        odd_count = int(ODD_MASK[number_idx].sum())
         even_count = 6 - odd_count
         if 2 <= odd_count <= 4 and 2 <= even_count <= 4:
             combo_score += 15
@@ -285,13 +216,13 @@ class TotoPredictor:
         elif consecutive_count == 2:
             combo_score += 5
         
-        max_individual = max(scores.values()) * 6
+        max_individual = scores_arr[1:].max() * 6
         max_combo = 100
         
         confidence = ((individual_score / max_individual) * 0.6 + 
                      (combo_score / max_combo) * 0.4) * 100
         
-        return min(confidence, 100)
+        return float(min(confidence, 100))
     
     def predict(self, target_date=None):
         """予測実行"""
@@ -304,85 +235,132 @@ class TotoPredictor:
         
         # データ読み込み
         data = self.load_data()
-        if not data:
+        if len(data) == 0:
             return
         
         # スコア計算
-        scores, recent_counts = self.calculate_scores(data)
+        scores_arr, recent_ranking = self.calculate_scores(data)
         
         # パターン生成
-        patterns = self.generate_patterns(scores, recent_counts)
+        patterns = self.generate_patterns(scores_arr, recent_ranking)
         
-        # 結果表示
-        print(f"📊 データ分析完了（{len(data)}回分）")
-        print(f"🔢 予測パターン数: {len(patterns)}")
-        print()
+        # 結果表示（画面とファイルで同じ行を1回だけ整形）
+        result_lines = self.build_result_lines(target_date, len(data), patterns)
         
-        result_lines = []
-        result_lines.append(f"🎯 Toto丸くん - {target_date}予測")
-        result_lines.append("=" * 60)
-        result_lines.append(f"📊 データ分析完了（{len(data)}回分）")
-        result_lines.append(f"🔢 予測パターン数: {len(patterns)}")
-        result_lines.append("")
+        # 見出し2行は表示済み
+        print('\n'.join(result_lines[2:]))
         
-        for i, (numbers, confidence, strategy) in enumerate(patterns, 1):
-            total_sum = sum(numbers)
-            odd_count = sum(1 for num in numbers if num % 2 == 1)
-            even_count = 6 - odd_count
-            
-            print(f"【パターン{i}】信頼度: {confidence:.1f}% ({strategy})")
-            print(f"予測数字: {numbers}")
-            print(f"合計: {total_sum} | 奇数/偶数: {odd_count}/{even_count}")
-            print(f"範囲: {max(numbers) - min(numbers)}")
-            print("-" * 60)
-            
-            result_lines.append(f"【パターン{i}】信頼度: {confidence:.1f}% ({strategy})")
-            result_lines.append(f"予測数字: {numbers}")
-            result_lines.append(f"合計: {total_sum} | 奇数/偶数: {odd_count}/{even_count}")
-            result_lines.append(f"範囲: {max(numbers) - min(numbers)}")
-            result_lines.append("-" * 60)
-        
-        print("🎲 予測完了！")
-        print("=" * 60)
+        # 結果をファイルに保存
+        result_file = self.save_results(target_date, result_lines, patterns)
         
+        print(f"💾 結果を {result_file} に保存しました")
+        return patterns
+    
+    def predict_batch(self, target_dates):
+        """複数日付の予測を一括実行"""
+        # 予測はデータのみで決まり日付に依存しないため、スコア計算とパターン生成は1回だけ
+        data = self.load_data()
+        if len(data) == 0:
+            return {}
+        
+        scores_arr, recent_ranking = self.calculate_scores(data)
+        patterns = self.generate_patterns(scores_arr, recent_ranking)
+        
+        results = {}
+        for target_date in target_dates:
+            result_lines = self.build_result_lines(target_date, len(data), patterns)
+            result_file = self.save_results(target_date, result_lines, patterns)
+            print(f"💾 {target_date}の結果を {result_file} に保存しました")
+            results[target_date] = patterns
+        return results
+    
+    def build_result_lines(self, target_date, n_draws, patterns):
+        """予測結果の表示・保存用の行"""
+        result_lines = [
+            f"🎯 Toto丸くん - {target_date}予測",
+            "=" * 60,
+            f"📊 データ分析完了（{n_draws}回分）",
+            f"🔢 予測パターン数: {len(patterns)}",
+            "",
+        ]
+        for i, (numbers, confidence, strategy) in enumerate(patterns, 1):
+            result_lines.extend(self.format_pattern_lines(i, numbers, confidence, strategy))
         result_lines.append("🎲 予測完了！")
         result_lines.append("=" * 60)
-        
-        # 結果をファイルに保存
+        return result_lines
+    
+    def save_results(self, target_date, result_lines, patterns):
+        """予測結果をテキストと評価用JSONに保存し、テキストのパスを返す"""
         result_file = os.path.join(self.results_dir, f"result_{target_date}.txt")
         with open(result_file, 'w', encoding='utf-8') as f:
             f.write('\n'.join(result_lines))
         
-        print(f"💾 結果を {result_file} に保存しました")
-        return patterns
+        # 評価用に機械可読なJSONも保存
+        with open(self.result_json_path(target_date), 'w', encoding='utf-8') as f:
+            json.dump([
+                {'pattern': i, 'numbers': [int(num) for num in numbers], 'confidence': float(confidence), 'strategy': strategy}
+                for i, (numbers, confidence, strategy) in enumerate(patterns, 1)
+            ], f, ensure_ascii=False, indent=2)
+        
+        return result_file
     
-    def evaluate_prediction(self, target_date, actual_numbers, bonus_number=None):
-        """予測結果の評価"""
+    def format_pattern_lines(self, i, numbers, confidence, strategy):
+        """予測パターン1件分の表示行"""
+        odd_count = sum(1 for num in numbers if num % 2 == 1)
+        return [
+            f"【パターン{i}】信頼度: {confidence:.1f}% ({strategy})",
+            f"予測数字: {numbers}",
+            f"合計: {sum(numbers)} | 奇数/偶数: {odd_count}/{6 - odd_count}",
+            f"範囲: {max(numbers) - min(numbers)}",
+            "-" * 60,
+        ]
+    
+    def result_json_path(self, target_date):
+        """予測結果JSONのパス"""
+        return os.path.join(self.results_dir, f"result_{target_date}.json")
+    
+    def load_prediction_patterns(self, target_date):
+        """保存済みの予測パターンを読み込み [(パターン番号, 数字, 信頼度, 戦略), ...]"""
+        json_file = self.result_json_path(target_date)
+        if os.path.exists(json_file):
+            with open(json_file, 'r', encoding='utf-8') as f:
+                return [
+                    (entry['pattern'], entry['numbers'], entry['confidence'], entry['strategy'])
+                    for entry in json.load(f)
+                ]
+        
+        # JSONがない古い予測結果はテキストから読み取る
         result_file = os.path.join(self.results_dir, f"result_{target_date}.txt")
-        
         if not os.path.exists(result_file):
-            print(f"❌ {target_date}の予測結果が見つかりません")
-            return
+            return None
         
-        # 予測結果を読み込み
         with open(result_file, 'r', encoding='utf-8') as f:
             lines = f.readlines()
         
-        # 予測パターンを抽出
         patterns = []
-        for line in lines:
-            if line.startswith("【パターン") and "信頼度:" in line:
-                parts = line.strip().split()
-                pattern_num = int(parts[0][4:-1])
-                confidence = float(parts[2][:-1])
-                strategy = parts[3][1:-1]
+        header = re.compile(r"【パターン(\d+)】信頼度: ([\d.]+)% \((.*)\)")
+        for idx, line in enumerate(lines):
+            match = header.match(line.strip())
+            if match and idx + 1 < len(lines):
+                pattern_num = int(match.group(1))
+                confidence = float(match.group(2))
+                strategy = match.group(3)
                 
                 # 次の行から数字を取得
-                numbers_line = lines[lines.index(line) + 1]
+                numbers_line = lines[idx + 1]
                 numbers_str = numbers_line.split(": ")[1].strip()
-                numbers = eval(numbers_str)
+                numbers = json.loads(numbers_str)
                 
                 patterns.append((pattern_num, numbers, confidence, strategy))
+        return patterns
+    
+    def evaluate_prediction(self, target_date, actual_numbers, bonus_number=None):
+        """予測結果の評価"""
+        # 予測結果を読み込み
+        patterns = self.load_prediction_patterns(target_date)
+        if patterns is None:
+            print(f"❌ {target_date}の予測結果が見つかりません")
+            return
         
         # 評価実行
         print(f"\n🎯 {target_date}予測結果の評価")
@@ -394,9 +372,11 @@ class TotoPredictor:
         best_match = 0
         best_prediction = None
         
+        actual_mask = number_mask(actual_numbers)
         for pattern_num, predicted, confidence, strategy in patterns:
-            matches = len(set(predicted) & set(actual_numbers))
-            hit_numbers = list(set(predicted) & set(actual_numbers))
+            hit_mask = number_mask(predicted) & actual_mask
+            matches = hit_mask.bit_count()
+            hit_numbers = [num for num in range(1, 50) if hit_mask >> num & 1]
             bonus_match = bonus_number in predicted if bonus_number else False
             
             print(f"\n【パターン{pattern_num}】信頼度: {confidence:.1f}% ({strategy})")
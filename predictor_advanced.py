@@ -1,12 +1,50 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import csv
 import os
 import sys
 from datetime import datetime, timedelta
-from collections import Counter
-import statistics
+from functools import lru_cache
+
+import numpy as np
+
+from number_selection import fill_pattern, load_draw_numbers, top_k_indices
+
+# 数字ごとの範囲番号（添字 = 数字、0: 低 1-16、1: 中 17-32、2: 高 33-49）
+RANGE_INDEX = np.searchsorted([17, 33], np.arange(50), side='right')
+RANGE_NAMES = ('low', 'mid', 'high')
+# 範囲内の個数 -> 範囲バランスの加点（2個 +20、1個 +10、3個 +5、それ以外 -5）
+RANGE_BALANCE_POINTS = np.array([-5, 10, 20, 5, -5, -5, -5])
+
+def rank_numbers(scores_arr, k, start=1, end=49):
+    """start-end の数字のうちスコア上位k個を降順に並べる（同点は小さい数字が先）"""
+    return (top_k_indices(scores_arr[start:end + 1], k) + start).tolist()
+
+def score_numbers(total_counts, recent_counts, range_frequencies, common_gap_values):
+    """数字ごとのスコアを配列で一括計算（添字 = 数字）"""
+    # 基本的な出現頻度と最近の出現頻度
+    scores = (total_counts * 2 + recent_counts * 8).astype(np.float64)
+    
+    # 範囲バランス
+    range_freq = np.array([range_frequencies[name] for name in RANGE_NAMES])
+    scores += range_freq[RANGE_INDEX] * 100
+    
+    # 間隔分析
+    scores[np.fromiter(common_gap_values, dtype=np.intp)] += 10
+    
+    # 合計値制御（小さな数字を少し重視）
+    scores[:21] += 5
+    
+    return scores
+
+@lru_cache(maxsize=4)
+def _load_parsed(path, mtime_ns, size):
+    """CSVを解析して当選番号の行列を返す（更新時刻・サイズが同じなら再解析しない）"""
+    # 当選番号の行列 (抽選回数 x 6)、1-49なので int8 で保持
+    # キャッシュで共有するため読み取り専用にする
+    draws = load_draw_numbers(path)
+    draws.flags.writeable = False
+    return draws
 
 class AdvancedTotoPredictor:
     def __init__(self):
@@ -21,69 +59,41 @@ class AdvancedTotoPredictor:
     
     def load_data(self):
         """CSVデータの読み込み"""
-        data = []
         try:
-            with open(self.csv_file, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                next(reader)  # ヘッダーをスキップ
-                for row in reader:
-                    if len(row) >= 7:
-                        numbers = []
-                        for i in range(1, 7):
-                            try:
-                                num = int(row[i])
-                                if 1 <= num <= 49:
-                                    numbers.append(num)
-                            except ValueError:
-                                continue
-                        if len(numbers) == 6:
-                            data.append(numbers)
+            stat = os.stat(self.csv_file)
+            data = _load_parsed(self.csv_file, stat.st_mtime_ns, stat.st_size)
             print(f"✅ {len(data)}回分のデータを読み込みました")
             return data
         except FileNotFoundError:
             print(f"❌ {self.csv_file}が見つかりません")
-            return []
+            return np.empty((0, 6), dtype=np.int8)
     
     def analyze_number_ranges(self, data):
         """数字の範囲分布を分析"""
-        ranges = {
-            'low': (1, 16),      # 1-16
-            'mid': (17, 32),     # 17-32  
-            'high': (33, 49)     # 33-49
+        # 数字ごとの出現回数から各範囲の出現回数を求める
+        counts = np.bincount(data.ravel(), minlength=50)
+        range_counts = {
+            'low': int(counts[1:17].sum()),     # 1-16
+            'mid': int(counts[17:33].sum()),    # 17-32
+            'high': int(counts[33:50].sum())    # 33-49
         }
         
-        range_counts = {'low': 0, 'mid': 0, 'high': 0}
-        range_numbers = {'low': [], 'mid': [], 'high': []}
-        
-        for draw in data:
-            for num in draw:
-                if ranges['low'][0] <= num <= ranges['low'][1]:
-                    range_counts['low'] += 1
-                    range_numbers['low'].append(num)
-                elif ranges['mid'][0] <= num <= ranges['mid'][1]:
-                    range_counts['mid'] += 1
-                    range_numbers['mid'].append(num)
-                elif ranges['high'][0] <= num <= ranges['high'][1]:
-                    range_counts['high'] += 1
-                    range_numbers['high'].append(num)
-        
         # 各範囲の出現頻度を計算
         total_numbers = sum(range_counts.values())
         range_frequencies = {}
         for range_name, count in range_counts.items():
             range_frequencies[range_name] = count / total_numbers
         
-        return range_frequencies, range_numbers
+        return range_frequencies
     
     def analyze_sum_patterns(self, data):
         """合計値の傾向を分析"""
-        sums = []
-        for draw in data:
-            sums.append(sum(draw))
+        # 各回の合計値を行方向に一括で求める（int8 の桁あふれを避けて整数で集計）
+        sums = data.sum(axis=1, dtype=np.int64)
         
-        avg_sum = statistics.mean(sums)
-        median_sum = statistics.median(sums)
-        std_sum = statistics.stdev(sums) if len(sums) > 1 else 0
+        avg_sum = float(sums.mean())
+        median_sum = float(np.median(sums))
+        std_sum = float(sums.std(ddof=1)) if len(sums) > 1 else 0
         
         # 合計値の分布を分析
         sum_ranges = {
@@ -102,20 +112,18 @@ class AdvancedTotoPredictor:
     
     def analyze_number_gaps(self, data):
         """隣接数字の間隔を分析"""
-        all_gaps = []
-        gap_patterns = []
+        # 各回を昇順に並べ、隣接する数字の差を行列で求める
+        gap_patterns = np.diff(np.sort(data, axis=1), axis=1)
+        all_gaps = gap_patterns.ravel()
         
-        for draw in data:
-            sorted_draw = sorted(draw)
-            gaps = []
-            for i in range(len(sorted_draw) - 1):
-                gap = sorted_draw[i+1] - sorted_draw[i]
-                gaps.append(gap)
-                all_gaps.append(gap)
-            gap_patterns.append(gaps)
+        avg_gap = float(all_gaps.mean())
         
-        avg_gap = statistics.mean(all_gaps)
-        common_gaps = Counter(all_gaps).most_common(5)
+        # 出現回数の多い間隔の上位5件（同数は先に出現した間隔を優先）
+        gap_counts = np.bincount(all_gaps, minlength=49)
+        gap_values, first_index = np.unique(all_gaps, return_index=True)
+        gap_values = gap_values[np.argsort(first_index)]
+        top_gaps = gap_values[np.argsort(-gap_counts[gap_values], kind='stable')[:5]]
+        common_gaps = [(int(gap), int(gap_counts[gap])) for gap in top_gaps]
         
         return {
             'average_gap': avg_gap,
@@ -127,23 +135,19 @@ class AdvancedTotoPredictor:
     def analyze_temporal_patterns(self, data):
         """時間的なパターンを分析"""
         # 簡略化版：最近のデータを重視
-        recent_data = data[-10:] if len(data) >= 10 else data
-        recent_numbers = []
-        for draw in recent_data:
-            recent_numbers.extend(draw)
-        
-        recent_counts = Counter(recent_numbers)
-        return recent_counts
+        recent_numbers = data[-10:].ravel()
+        recent_counts = np.bincount(recent_numbers, minlength=50)
+        
+        # 最近出現した数字を出現回数の多い順に（同数は最近10回で先に出現した順）
+        seen_numbers, first_index = np.unique(recent_numbers, return_index=True)
+        seen_numbers = seen_numbers[np.argsort(first_index)]
+        recent_ranking = seen_numbers[np.argsort(-recent_counts[seen_numbers], kind='stable')].tolist()
+        return recent_counts, recent_ranking
     
     def calculate_advanced_scores(self, data):
         """高度なスコア計算"""
-        all_numbers = []
-        for draw in data:
-            all_numbers.extend(draw)
-        number_counts = Counter(all_numbers)
-        
         # 範囲分析
-        range_frequencies, range_numbers = self.analyze_number_ranges(data)
+        range_frequencies = self.analyze_number_ranges(data)
         
         # 合計値分析
         sum_analysis = self.analyze_sum_patterns(data)
@@ -152,46 +156,23 @@ class AdvancedTotoPredictor:
         gap_analysis = self.analyze_number_gaps(data)
         
         # 時間的パターン
-        temporal_counts = self.analyze_temporal_patterns(data)
+        temporal_counts, temporal_ranking = self.analyze_temporal_patterns(data)
+        common_gap_values = frozenset(gap for gap, _ in gap_analysis['common_gaps'])
         
-        scores = {}
-        for num in range(1, 50):
-            score = 0
-            
-            # 基本的な出現頻度
-            total_count = number_counts.get(num, 0)
-            score += total_count * 2
-            
-            # 最近の出現頻度
-            recent_count = temporal_counts.get(num, 0)
-            score += recent_count * 8
-            
-            # 範囲バランス
-            if 1 <= num <= 16:
-                score += range_frequencies['low'] * 100
-            elif 17 <= num <= 32:
-                score += range_frequencies['mid'] * 100
-            else:
-                score += range_frequencies['high'] * 100
-            
-            # 間隔分析
-            if num in gap_analysis['common_gaps']:
-                score += 10
-            
-            # 合計値制御（小さな数字を少し重視）
-            if num <= 20:
-                score += 5
-            
-            scores[num] = score
+        # 全体と最近10回の出現回数から数字ごとのスコアを一括計算
+        total_counts = np.bincount(data.ravel(), minlength=50)
+        score_arr = score_numbers(total_counts, temporal_counts, range_frequencies, common_gap_values)
+        score_arr[0] = 0  # 0は数字ではない
         
-        return scores, {
+        return score_arr, {
             'range_frequencies': range_frequencies,
             'sum_analysis': sum_analysis,
             'gap_analysis': gap_analysis,
-            'temporal_counts': temporal_counts
+            'temporal_counts': temporal_counts,
+            'temporal_ranking': temporal_ranking
         }
     
-    def generate_balanced_range_pattern(self, scores, analysis_data):
+    def generate_balanced_range_pattern(self, scores_arr, analysis_data):
         """範囲バランスを重視したパターン生成"""
         pattern = []
         
@@ -199,13 +180,8 @@ class AdvancedTotoPredictor:
         ranges = [(1, 16), (17, 32), (33, 49)]
         
         for start, end in ranges:
-            range_numbers = [(num, scores[num]) for num in range(start, end+1)]
-            range_numbers.sort(key=lambda x: x[1], reverse=True)
-            
             # 各範囲から上位2個を選択
-            for num, _ in range_numbers[:2]:
-                if len(pattern) < 6:
-                    pattern.append(num)
+            pattern.extend(rank_numbers(scores_arr, 2, start, end))
         
         pattern.sort()
         return pattern
@@ -217,48 +193,47 @@ class AdvancedTotoPredictor:
             return numbers  # 適切な範囲内
         
         # 合計値を調整
-        if current_sum > 150:
+        if current_sum > 150 and len(numbers) == 6:
+            # 置き換え先の候補（1-20で未使用の数字、昇順）は一度だけ求める
+            used = set(numbers)
+            available = [num for num in range(1, 21) if num not in used]
+            
             # 大きな数字を小さな数字に置き換え
             for i, num in enumerate(numbers):
-                if num > 30 and len(numbers) == 6:
-                    for replacement in range(1, 21):
-                        if replacement not in numbers:
-                            new_numbers = numbers.copy()
-                            new_numbers[i] = replacement
-                            if 130 <= sum(new_numbers) <= 150:
-                                return sorted(new_numbers)
+                if num > 30:
+                    # 置き換え後の合計が130-150になる置き換え先のうち最小のもの
+                    rest = current_sum - num
+                    replacement = next((r for r in available if r >= 130 - rest), None)
+                    if replacement is not None and replacement <= 150 - rest:
+                        new_numbers = list(numbers)
+                        new_numbers[i] = replacement
+                        return sorted(new_numbers)
         
         return numbers
     
-    def generate_advanced_patterns(self, scores, analysis_data):
-        """高度なパターン生成"""
-        patterns = []
-        used_combinations = set()
+    def generate_advanced_patterns(self, scores_arr, analysis_data):
+        """高度なパターン生成（scores_arr は数字で引けるスコア配列）"""
+        # 信頼度計算で使う最高スコアの6倍と、スコア上位の数字は一度だけ求める
+        # （パターン2は上位20個、パターン5は上位15個だけを走査し、補充は既存の数字を
+        #   飛ばしても先頭6個までで6個そろうため、上位20個より先は参照されない）
+        max_score_x6 = float(scores_arr[1:].max()) * 6
+        sorted_numbers = rank_numbers(scores_arr, 20)
         
         # パターン1: 範囲バランス重視
-        pattern1 = self.generate_balanced_range_pattern(scores, analysis_data)
+        pattern1 = self.generate_balanced_range_pattern(scores_arr, analysis_data)
         pattern1 = self.control_sum_value(pattern1)
-        if tuple(pattern1) not in used_combinations:
-            used_combinations.add(tuple(pattern1))
-            confidence = self.calculate_confidence(pattern1, scores)
-            patterns.append((pattern1, confidence, "範囲バランス重視"))
         
         # パターン2: 合計値制御重視
         pattern2 = []
         target_sum = 140
-        sorted_numbers = sorted(scores.items(), key=lambda x: x[1], reverse=True)
         
-        for num, _ in sorted_numbers[:20]:
+        for num in sorted_numbers:
             if len(pattern2) < 6 and num not in pattern2:
                 current_sum = sum(pattern2) + num
                 if len(pattern2) < 5 or abs(current_sum - target_sum) <= 20:
                     pattern2.append(num)
         
         pattern2.sort()
-        if tuple(pattern2) not in used_combinations:
-            used_combinations.add(tuple(pattern2))
-            confidence = self.calculate_confidence(pattern2, scores)
-            patterns.append((pattern2, confidence, "合計値制御重視"))
         
         # パターン3: 間隔分析重視
         gap_analysis = analysis_data['gap_analysis']
@@ -277,81 +252,54 @@ class AdvancedTotoPredictor:
                         start_num = next_num
         
         # 残りを高スコアで補充
-        for num, _ in sorted_numbers:
-            if len(pattern3) < 6 and num not in pattern3:
-                pattern3.append(num)
+        fill_pattern(pattern3, sorted_numbers)
         
         pattern3.sort()
-        if tuple(pattern3) not in used_combinations:
-            used_combinations.add(tuple(pattern3))
-            confidence = self.calculate_confidence(pattern3, scores)
-            patterns.append((pattern3, confidence, "間隔分析重視"))
         
         # パターン4: 時間的パターン重視
-        temporal_counts = analysis_data['temporal_counts']
-        recent_favored = sorted(temporal_counts.items(), key=lambda x: x[1], reverse=True)
+        recent_favored = analysis_data['temporal_ranking']
         
-        pattern4 = []
-        for num, _ in recent_favored[:15]:
-            if len(pattern4) < 6 and num not in pattern4:
-                pattern4.append(num)
+        pattern4 = fill_pattern([], recent_favored[:15])
         
         pattern4.sort()
-        if tuple(pattern4) not in used_combinations:
-            used_combinations.add(tuple(pattern4))
-            confidence = self.calculate_confidence(pattern4, scores)
-            patterns.append((pattern4, confidence, "時間的パターン重視"))
         
         # パターン5: 高スコア重視（従来）
-        pattern5 = []
-        for num, _ in sorted_numbers[:15]:
-            if len(pattern5) < 6 and num not in pattern5:
-                pattern5.append(num)
+        pattern5 = fill_pattern([], sorted_numbers[:15])
         pattern5.sort()
-        if tuple(pattern5) not in used_combinations:
-            used_combinations.add(tuple(pattern5))
-            confidence = self.calculate_confidence(pattern5, scores)
-            patterns.append((pattern5, confidence, "高スコア重視"))
         
         # パターン6: 低範囲重視
-        pattern6 = []
-        low_range_numbers = [(num, scores[num]) for num in range(1, 21)]
-        low_range_numbers.sort(key=lambda x: x[1], reverse=True)
-        
-        for num, _ in low_range_numbers[:8]:
-            if len(pattern6) < 6 and num not in pattern6:
-                pattern6.append(num)
+        pattern6 = fill_pattern([], rank_numbers(scores_arr, 8, 1, 20))
         
         # 残りを高スコアで補充
-        for num, _ in sorted_numbers:
-            if len(pattern6) < 6 and num not in pattern6:
-                pattern6.append(num)
+        fill_pattern(pattern6, sorted_numbers)
         
         pattern6.sort()
-        if tuple(pattern6) not in used_combinations:
-            used_combinations.add(tuple(pattern6))
-            confidence = self.calculate_confidence(pattern6, scores)
-            patterns.append((pattern6, confidence, "低範囲重視"))
         
         # パターン7: 高範囲重視
-        pattern7 = []
-        high_range_numbers = [(num, scores[num]) for num in range(30, 50)]
-        high_range_numbers.sort(key=lambda x: x[1], reverse=True)
-        
-        for num, _ in high_range_numbers[:8]:
-            if len(pattern7) < 6 and num not in pattern7:
-                pattern7.append(num)
+        pattern7 = fill_pattern([], rank_numbers(scores_arr, 8, 30, 49))
         
         # 残りを高スコアで補充
-        for num, _ in sorted_numbers:
-            if len(pattern7) < 6 and num not in pattern7:
-                pattern7.append(num)
+        fill_pattern(pattern7, sorted_numbers)
         
         pattern7.sort()
-        if tuple(pattern7) not in used_combinations:
-            used_combinations.add(tuple(pattern7))
-            confidence = self.calculate_confidence(pattern7, scores)
-            patterns.append((pattern7, confidence, "高範囲重視"))
+        
+        patterns = []
+        used_combinations = set()
+        
+        # 重複する組み合わせを除き、異なる組み合わせごとに1回だけ信頼度を計算
+        for numbers, strategy in (
+            (pattern1, "範囲バランス重視"),
+            (pattern2, "合計値制御重視"),
+            (pattern3, "間隔分析重視"),
+            (pattern4, "時間的パターン重視"),
+            (pattern5, "高スコア重視"),
+            (pattern6, "低範囲重視"),
+            (pattern7, "高範囲重視"),
+        ):
+            if tuple(numbers) not in used_combinations:
+                used_combinations.add(tuple(numbers))
+                confidence = self.calculate_confidence(numbers, scores_arr, max_score_x6)
+                patterns.append((numbers, confidence, strategy))
         
         # 信頼度順にソート
         patterns.sort(key=lambda x: x[1], reverse=True)
@@ -361,68 +309,43 @@ class AdvancedTotoPredictor:
             # 不足している場合は追加パターンを生成
             while len(patterns) < 6:
                 # ランダムなパターンを生成
-                remaining_pattern = []
-                for num, _ in sorted_numbers:
-                    if len(remaining_pattern) < 6 and num not in remaining_pattern:
-                        remaining_pattern.append(num)
+                remaining_pattern = fill_pattern([], sorted_numbers)
                 
                 remaining_pattern.sort()
                 if tuple(remaining_pattern) not in used_combinations:
                     used_combinations.add(tuple(remaining_pattern))
-                    confidence = self.calculate_confidence(remaining_pattern, scores)
+                    confidence = self.calculate_confidence(remaining_pattern, scores_arr, max_score_x6)
                     patterns.append((remaining_pattern, confidence, f"補完パターン{len(patterns)+1}"))
         
         return patterns[:6]
     
-    def calculate_confidence(self, numbers, scores):
-        """信頼度を計算"""
-        individual_score = sum(scores[num] for num in numbers)
-        
-        combo_score = 0
-        
-        # 範囲バランス
-        ranges = [(1,16), (17,32), (33,49)]
-        range_counts = [0] * 3
-        for num in numbers:
-            for i, (start, end) in enumerate(ranges):
-                if start <= num <= end:
-                    range_counts[i] += 1
-                    break
-        
-        # 各範囲に2個ずつあると高評価
-        for count in range_counts:
-            if count == 2:
-                combo_score += 20
-            elif count == 1:
-                combo_score += 10
-            elif count == 3:
-                combo_score += 5
-            else:
-                combo_score -= 5
+    def calculate_confidence(self, numbers, scores_arr, max_score_x6):
+        """信頼度を計算（scores_arr は数字で引けるスコア配列、max_score_x6 は最高スコアの6倍）"""
+        picks = np.asarray(numbers, dtype=np.intp)
+        individual_score = float(scores_arr[picks].sum())
+        
+        # 範囲バランス（各範囲に2個ずつあると高評価）
+        range_counts = np.bincount(RANGE_INDEX[picks], minlength=3)
+        combo_score = int(RANGE_BALANCE_POINTS[range_counts].sum())
         
         # 合計値
-        total_sum = sum(numbers)
+        total_sum = int(picks.sum())
         if 130 <= total_sum <= 150:
             combo_score += 30
         elif 120 <= total_sum <= 160:
             combo_score += 15
         
         # 間隔バランス
-        gaps = []
-        sorted_numbers = sorted(numbers)
-        for i in range(len(sorted_numbers) - 1):
-            gaps.append(sorted_numbers[i+1] - sorted_numbers[i])
-        
-        avg_gap = statistics.mean(gaps) if gaps else 0
+        gaps = np.diff(np.sort(picks))
+        avg_gap = float(gaps.mean()) if gaps.size else 0
         if 5 <= avg_gap <= 15:
             combo_score += 20
         elif 3 <= avg_gap <= 20:
             combo_score += 10
         
-        max_individual = max(scores.values()) * 6
         max_combo = 100
         
-        confidence = ((individual_score / max_individual) * 0.6 + 
+        confidence = ((individual_score / max_score_x6) * 0.6 + 
                      (combo_score / max_combo) * 0.4) * 100
         
         return min(confidence, 100)
@@ -438,69 +361,20 @@ class AdvancedTotoPredictor:
         
         # データ読み込み
         data = self.load_data()
-        if not data:
+        if len(data) == 0:
             return
         
         # 高度なスコア計算
-        scores, analysis_data = self.calculate_advanced_scores(data)
+        scores_arr, analysis_data = self.calculate_advanced_scores(data)
         
         # 高度なパターン生成
-        patterns = self.generate_advanced_patterns(scores, analysis_data)
-        
-        # 分析結果表示
-        print(f"📊 高度なデータ分析完了（{len(data)}回分）")
-        print(f"🔢 予測パターン数: {len(patterns)}")
-        
-        # 範囲分析結果
-        range_freq = analysis_data['range_frequencies']
-        print(f"📈 範囲分布: 低(1-16): {range_freq['low']:.1%}, 中(17-32): {range_freq['mid']:.1%}, 高(33-49): {range_freq['high']:.1%}")
-        
-        # 合計値分析結果
-        sum_analysis = analysis_data['sum_analysis']
-        print(f"💰 平均合計値: {sum_analysis['average']:.1f} ± {sum_analysis['std']:.1f}")
-        
-        print()
+        patterns = self.generate_advanced_patterns(scores_arr, analysis_data)
         
-        result_lines = []
-        result_lines.append(f"🎯 高度なToto丸くん - {target_date}予測")
-        result_lines.append("=" * 60)
-        result_lines.append(f"📊 高度なデータ分析完了（{len(data)}回分）")
-        result_lines.append(f"🔢 予測パターン数: {len(patterns)}")
-        result_lines.append(f"📈 範囲分布: 低(1-16): {range_freq['low']:.1%}, 中(17-32): {range_freq['mid']:.1%}, 高(33-49): {range_freq['high']:.1%}")
-        result_lines.append(f"💰 平均合計値: {sum_analysis['average']:.1f} ± {sum_analysis['std']:.1f}")
-        result_lines.append("")
+        # 結果表示（画面とファイルで同じ行を1回だけ整形）
+        result_lines = self.build_result_lines(target_date, len(data), patterns, analysis_data)
         
-        for i, (numbers, confidence, strategy) in enumerate(patterns, 1):
-            total_sum = sum(numbers)
-            odd_count = sum(1 for num in numbers if num % 2 == 1)
-            even_count = 6 - odd_count
-            
-            # 範囲分析
-            ranges = [(1,16), (17,32), (33,49)]
-            range_counts = [0] * 3
-            for num in numbers:
-                for j, (start, end) in enumerate(ranges):
-                    if start <= num <= end:
-                        range_counts[j] += 1
-                        break
-            
-            print(f"【パターン{i}】信頼度: {confidence:.1f}% ({strategy})")
-            print(f"予測数字: {numbers}")
-            print(f"合計: {total_sum} | 奇数/偶数: {odd_count}/{even_count}")
-            print(f"範囲分布: 低{range_counts[0]}個, 中{range_counts[1]}個, 高{range_counts[2]}個")
-            print("-" * 60)
-            
-            result_lines.append(f"【パターン{i}】信頼度: {confidence:.1f}% ({strategy})")
-            result_lines.append(f"予測数字: {numbers}")
-            result_lines.append(f"合計: {total_sum} | 奇数/偶数: {odd_count}/{even_count}")
-            result_lines.append(f"範囲分布: 低{range_counts[0]}個, 中{range_counts[1]}個, 高{range_counts[2]}個")
-            result_lines.append("-" * 60)
-        
-        print("🎲 高度な予測完了！")
-        print("=" * 60)
-        
-        result_lines.append("🎲 高度な予測完了！")
-        result_lines.append("=" * 60)
+        # 見出し2行は表示済み
+        print('\n'.join(result_lines[2:]))
         
         # 結果をファイルに保存
         result_file = os.path.join(self.results_dir, f"result_advanced_{target_date}.txt")
@@ -509,6 +383,45 @@ class AdvancedTotoPredictor:
         
         print(f"💾 結果を {result_file} に保存しました")
         return patterns
+    
+    def build_result_lines(self, target_date, n_draws, patterns, analysis_data):
+        """予測結果の表示・保存用の行"""
+        range_freq = analysis_data['range_frequencies']
+        sum_analysis = analysis_data['sum_analysis']
+        result_lines = [
+            f"🎯 高度なToto丸くん - {target_date}予測",
+            "=" * 60,
+            f"📊 高度なデータ分析完了（{n_draws}回分）",
+            f"🔢 予測パターン数: {len(patterns)}",
+            f"📈 範囲分布: 低(1-16): {range_freq['low']:.1%}, 中(17-32): {range_freq['mid']:.1%}, 高(33-49): {range_freq['high']:.1%}",
+            f"💰 平均合計値: {sum_analysis['average']:.1f} ± {sum_analysis['std']:.1f}",
+            "",
+        ]
+        
+        # パターンごとの合計・奇数の個数・範囲別の個数をまとめて求める
+        # （6個に満たないパターンもあるため、連結した配列を区間ごとに集計）
+        picks = np.concatenate([numbers for numbers, _, _ in patterns]).astype(np.intp)
+        starts = np.cumsum([0] + [len(numbers) for numbers, _, _ in patterns[:-1]])
+        pattern_sums = np.add.reduceat(picks, starts).tolist()
+        pattern_odds = np.add.reduceat(picks & 1, starts).tolist()
+        pattern_ranges = np.add.reduceat(
+            (RANGE_INDEX[picks][:, None] == np.arange(3)).astype(np.intp), starts
+        ).tolist()
+        
+        for i, (numbers, confidence, strategy) in enumerate(patterns, 1):
+            odd_count = pattern_odds[i - 1]
+            range_counts = pattern_ranges[i - 1]
+            result_lines.extend([
+                f"【パターン{i}】信頼度: {confidence:.1f}% ({strategy})",
+                f"予測数字: {numbers}",
+                f"合計: {pattern_sums[i - 1]} | 奇数/偶数: {odd_count}/{6 - odd_count}",
+                f"範囲分布: 低{range_counts[0]}個, 中{range_counts[1]}個, 高{range_counts[2]}個",
+                "-" * 60,
+            ])
+        
+        result_lines.append("🎲 高度な予測完了！")
+        result_lines.append("=" * 60)
+        return result_lines
 
 def main():
     predictor = AdvancedTotoPredictor()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+高度予測システムのスコア計算のテスト（よく出る間隔の加点）
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from predictor_advanced import RANGE_INDEX, RANGE_NAMES, AdvancedTotoPredictor, score_numbers
+
+def base_scores(total_counts, recent_counts, range_frequencies):
+    """間隔の加点を除いたスコア"""
+    range_freq = np.array([range_frequencies[name] for name in RANGE_NAMES])
+    scores = total_counts * 2 + recent_counts * 8 + range_freq[RANGE_INDEX] * 100
+    scores[:21] += 5
+    return scores
+
+def test_common_gap_values_get_bonus():
+    zeros = np.zeros(50, dtype=np.int64)
+    range_frequencies = {'low': 0.3, 'mid': 0.3, 'high': 0.4}
+    scores = score_numbers(zeros, zeros, range_frequencies, frozenset({1, 3, 7}))
+
+    bonus = scores - base_scores(zeros, zeros, range_frequencies)
+    assert np.flatnonzero(bonus).tolist() == [1, 3, 7]
+    assert bonus[[1, 3, 7]].tolist() == [10, 10, 10]
+
+def test_top_common_gaps_receive_bonus(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = np.array([
+        [1, 2, 4, 8, 16, 32],
+        [3, 5, 7, 9, 11, 13],
+        [10, 11, 20, 21, 40, 41],
+        [6, 12, 18, 24, 30, 36],
+    ], dtype=np.int8)
+    predictor = AdvancedTotoPredictor()
+    scores, analysis = predictor.calculate_advanced_scores(data)
+
+    common_gaps = sorted(gap for gap, _ in analysis['gap_analysis']['common_gaps'])
+    total_counts = np.bincount(data.ravel(), minlength=50)
+    expected = base_scores(total_counts, analysis['temporal_counts'], analysis['range_frequencies'])
+    expected[0] = 0
+
+    # 上位の間隔と同じ数字にだけ +10
+    bonus = scores - expected
+    assert np.flatnonzero(bonus).tolist() == common_gaps
+    assert np.allclose(bonus[common_gaps], 10)
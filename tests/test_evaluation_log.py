@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+評価結果の追記ログ (evaluation_results.log) の統合のテスト
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluate import TotoEvaluator
+from learn_improved import ImprovedLearningSystem
+
+def append_log(path, evaluation):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(evaluation, ensure_ascii=False) + '\n')
+
+def test_unsaved_evaluations_are_visible_to_both_readers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'evaluation_results.json').write_text(
+        json.dumps({'2024-01-01': {'draw_date': '2024-01-01', 'predictions': []}}), encoding='utf-8'
+    )
+    # 保存前に中断した場合の追記分
+    append_log(tmp_path / 'evaluation_results.log', {'draw_date': '2024-01-08', 'predictions': []})
+
+    assert sorted(TotoEvaluator().results) == ['2024-01-01', '2024-01-08']
+    assert sorted(ImprovedLearningSystem().evaluation_data) == ['2024-01-01', '2024-01-08']
+
+    # 追記ログが増えたらキャッシュを使わずに読み直す
+    append_log(tmp_path / 'evaluation_results.log', {'draw_date': '2024-01-15', 'predictions': []})
+    assert sorted(ImprovedLearningSystem().evaluation_data) == ['2024-01-01', '2024-01-08', '2024-01-15']
+
+def test_save_compacts_log_into_json(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    append_log(tmp_path / 'evaluation_results.log', {'draw_date': '2024-01-08', 'predictions': []})
+
+    evaluator = TotoEvaluator()
+    evaluator.save_evaluation_results()
+    assert not (tmp_path / 'evaluation_results.log').exists()
+    assert sorted(ImprovedLearningSystem().evaluation_data) == ['2024-01-08']
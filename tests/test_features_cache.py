@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+特徴量クラスのキャッシュ（配列キャッシュ <csv>.npz・特徴量メモ化）のテスト
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import TotoFeatures
+
+HEADER = 'DrawDate,Day,Number1,Number2,Number3,Number4,Number5,Number6\n'
+
+def write_draws(path, count):
+    rows = [f'2024-{i:04d},金,{1 + i % 40},{2 + i % 40},{3 + i % 40},{4 + i % 40},{5 + i % 40},{6 + i % 40}\n'
+            for i in range(count)]
+    path.write_text(HEADER + ''.join(rows), encoding='utf-8')
+
+def test_cache_hit_keeps_all_columns(tmp_path):
+    csv_file = tmp_path / 'totomaru.csv'
+    write_draws(csv_file, 30)
+    miss = TotoFeatures(str(csv_file))
+    assert os.path.exists(str(csv_file) + '.npz')
+    hit = TotoFeatures(str(csv_file))
+    pd.testing.assert_frame_equal(miss.data, hit.data)
+
+def test_older_csv_replacement_invalidates_cache(tmp_path):
+    csv_file = tmp_path / 'totomaru.csv'
+    write_draws(csv_file, 200)
+    assert len(TotoFeatures(str(csv_file)).data) == 200
+
+    # キャッシュより古い更新時刻のCSVに差し替える（cp -p / git checkout 相当）
+    write_draws(csv_file, 50)
+    os.utime(csv_file, (1, 1))
+    assert len(TotoFeatures(str(csv_file)).data) == 50
+
+def test_memoized_calls_share_one_entry(tmp_path):
+    csv_file = tmp_path / 'totomaru.csv'
+    write_draws(csv_file, 30)
+    features = TotoFeatures(str(csv_file))
+
+    # 既定値の省略・位置引数・キーワード引数が同じキャッシュを使う
+    first = features.get_recent_appearances()
+    assert features.get_recent_appearances(10) is first
+    assert features.get_recent_appearances(recent_count=10) is first
+    assert features.get_recent_appearances(5) is not first
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+当選番号CSV読み込みのテスト（列不足・崩れた行）
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from number_selection import load_draw_numbers
+from predictor import TotoPredictor
+from predictor_advanced import AdvancedTotoPredictor
+
+HEADER = 'DrawDate,Number1,Number2,Number3,Number4,Number5,Number6\n'
+
+def write_csv(tmp_path, text):
+    path = tmp_path / 'totomaru.csv'
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+def test_valid_rows(tmp_path):
+    path = write_csv(tmp_path, HEADER + '2024-01-01,1,2,3,4,5,6\n2024-01-08,7,8,9,10,11,49\n')
+    data = load_draw_numbers(path)
+    assert data.dtype == np.int8
+    assert data.tolist() == [[1, 2, 3, 4, 5, 6], [7, 8, 9, 10, 11, 49]]
+
+def test_malformed_rows_are_skipped(tmp_path):
+    path = write_csv(
+        tmp_path,
+        HEADER
+        + '2024-01-01,1,2,3,4,5,6,7,8\n'   # 列が多い行（先頭6個を採用）
+        + '2024-01-08,1,2,3\n'             # 列が足りない行
+        + '2024-01-15,1,2,x,4,5,6\n'       # 数値でない値
+        + '2024-01-22,1,2,3,4,5,50\n'      # 範囲外
+        + '2024-01-29,10,20,30,40,41,42\n'
+    )
+    assert load_draw_numbers(path).tolist() == [[1, 2, 3, 4, 5, 6], [10, 20, 30, 40, 41, 42]]
+
+def test_unterminated_quote(tmp_path):
+    path = write_csv(tmp_path, HEADER + '2024-01-01,1,2,3,4,5,6\n"2024-01-08,7,8,9,10,11,12\n')
+    assert load_draw_numbers(path).tolist() == [[1, 2, 3, 4, 5, 6]]
+
+def test_narrow_and_empty_csv(tmp_path):
+    path = write_csv(tmp_path, 'DrawDate,Number1,Number2\n2024-01-01,1,2\n')
+    assert load_draw_numbers(path).shape == (0, 6)
+    path = write_csv(tmp_path, '')
+    assert load_draw_numbers(path).shape == (0, 6)
+
+def test_predictors_load_malformed_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_csv(tmp_path, HEADER + '2024-01-01,1,2,3,4,5,6,7\n2024-01-08,7,8,9,10,11,12\n')
+    expected = [[1, 2, 3, 4, 5, 6], [7, 8, 9, 10, 11, 12]]
+    assert TotoPredictor().load_data().tolist() == expected
+    assert AdvancedTotoPredictor().load_data().tolist() == expected